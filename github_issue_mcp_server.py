@@ -16,11 +16,16 @@ Usage:
 """
 
 import os
+import re
 import sys
 import json
+import time
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import functools
+import contextvars
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import traceback
 
@@ -55,11 +60,51 @@ mcp = FastMCP("github-issue-resolver")
 #     "timestamp": str,
 #     "collections": List[str],
 #     "chroma_dir": str,
-#     "error_message": str (if status == "error")
+#     "error_message": str (if status == "error"),
+#     "head_shas": Dict[str, str] (default-branch HEAD per completed docs/code step)
 #   }
 # }
 analysis_results: Dict[str, Dict] = {}
 
+# Directories already created by _initialize_ingestion; every step call
+# would otherwise repeat the makedirs syscalls
+_verified_dirs: set = set()
+
+# Rendered get_repository_status text per repo, paired with a snapshot of the
+# fields it was built from; polls re-render only after the state changes
+_status_cache: Dict[str, Tuple[tuple, str]] = {}
+_STATUS_FIELDS = (
+    "status", "docs_stored", "code_chunks_stored", "issues_stored", "prs_stored",
+    "total_documents", "timestamp", "chroma_dir", "error_message"
+)
+
+def _status_snapshot(metadata: Dict) -> tuple:
+    """Cheap fingerprint of the state shown by get_repository_status."""
+    return tuple(metadata.get(field, KeyError) for field in _STATUS_FIELDS) + (
+        tuple(metadata.get("collections", ())),
+    )
+
+# GitHub client and embeddings shared by every ingestion step; created once
+# under a lock so concurrent steps never initialize them twice. The lock is
+# created on first use: on Python < 3.10 an asyncio.Lock binds to the loop
+# current at construction, which at import time is not the server's loop.
+_ingestion_clients: Optional[Tuple[Any, Any]] = None
+_ingestion_clients_lock: Optional[asyncio.Lock] = None
+
+async def _get_ingestion_clients() -> Tuple[Any, Any]:
+    """Return (github_client, embeddings), initializing them on first use."""
+    global _ingestion_clients, _ingestion_clients_lock
+    if _ingestion_clients is not None:
+        return _ingestion_clients
+    if _ingestion_clients_lock is None:
+        _ingestion_clients_lock = asyncio.Lock()
+    async with _ingestion_clients_lock:
+        if _ingestion_clients is None:
+            from issue_solver.ingest import initialize_clients as init_ingestion_clients
+            _ingestion_clients = await asyncio.to_thread(init_ingestion_clients)
+            logger.info("✅ Successfully initialized GitHub client and embeddings")
+    return _ingestion_clients
+
 def validate_environment() -> List[str]:
     """Validate environment variables and return missing ones."""
     required_vars = ["GOOGLE_API_KEY", "GITHUB_TOKEN"]
@@ -95,8 +140,8 @@ async def _initialize_ingestion(repo_name: str):
         # Import required modules locally to handle import errors gracefully
         try:
             from issue_solver.ingest import (
-                initialize_clients as init_ingestion_clients,
                 validate_repo_exists,
+                get_repo_cached,
                 CHROMA_PERSIST_DIR
             )
         except ImportError as e:
@@ -112,15 +157,16 @@ async def _initialize_ingestion(repo_name: str):
         
         # Initialize clients for ingestion
         try:
-            github_client, embeddings = await asyncio.to_thread(init_ingestion_clients)
-            logger.info("✅ Successfully initialized GitHub client and embeddings")
+            github_client, embeddings = await _get_ingestion_clients()
         except Exception as e:
             logger.error(f"Failed to initialize clients: {e}")
             return None, None, None, None, f"❌ **Client Initialization Failed**: {str(e)}\n\nPlease check your environment variables (GOOGLE_API_KEY, GITHUB_TOKEN)"
         
         # Validate repository access
         try:
-            repo = await asyncio.to_thread(lambda: github_client.get_repo(repo_name))
+            # Reuses the lookup made by validate_repo_exists above; the TTL'd cache
+            # keeps default_branch (read by the HEAD check) from going stale
+            repo = await _run_github_call(get_repo_cached, repo_name)
             logger.info(f"✅ Successfully connected to repository: {repo.full_name}")
         except Exception as e:
             logger.error(f"Repository access error: {e}")
@@ -130,8 +176,10 @@ async def _initialize_ingestion(repo_name: str):
         chroma_persist_dir = CHROMA_PERSIST_DIR
         
         try:
-            os.makedirs(chroma_persist_dir, exist_ok=True)
-            logger.info(f"✅ ChromaDB directory created/verified: {chroma_persist_dir}")
+            if chroma_persist_dir not in _verified_dirs:
+                os.makedirs(chroma_persist_dir, exist_ok=True)
+                _verified_dirs.add(chroma_persist_dir)
+                logger.info(f"✅ ChromaDB directory created/verified: {chroma_persist_dir}")
         except PermissionError as e:
             logger.error(f"❌ Permission denied creating ChromaDB directory: {e}")
             return None, None, None, None, f"❌ **Permission Error**: Cannot create ChromaDB directory at '{chroma_persist_dir}'. Please check file system permissions or set CHROMA_PERSIST_DIR environment variable to a writable location."
@@ -162,36 +210,110 @@ async def _initialize_ingestion(repo_name: str):
         return None, None, None, None, f"❌ **Error**: {error_msg}"
 
 
+@functools.lru_cache(maxsize=None)
+def _step_fetchers() -> Dict[str, Tuple[Callable, str]]:
+    """
+    Dispatch table for the ingestion fetchers, built once on first use.
+    
+    Maps each step to (fetcher, arg_kind). Every fetcher is a coroutine;
+    arg_kind says whether it takes the repository full name ("full_name")
+    or the PyGithub repository object ("repo"). The issues step streams its
+    batches through iter_repo_issue_batches_async instead.
+    """
+    from issue_solver.ingest import (
+        fetch_repo_docs,
+        fetch_repo_code,
+        fetch_repo_pr_history_async
+    )
+    return {
+        "docs": (fetch_repo_docs, "full_name"),
+        "code": (fetch_repo_code, "full_name"),
+        "prs": (fetch_repo_pr_history_async, "repo"),
+    }
+
+def _github_rate_limiter():
+    """Shared limiter gating blocking GitHub API work (created on first use)."""
+    from issue_solver.ratelimit import get_github_rate_limiter
+    return get_github_rate_limiter()
+
+async def _run_github_call(func, *args):
+    """Run a blocking PyGithub call in a thread under the shared rate limiter."""
+    from issue_solver.ingest import get_github_client
+    limiter = _github_rate_limiter()
+    async with limiter:
+        result = await asyncio.to_thread(func, *args)
+    limiter.update_from_client(get_github_client())
+    return result
+
+async def _get_head_sha(repo) -> Optional[str]:
+    """Return the SHA at the head of the default branch, or None if it cannot be read."""
+    try:
+        branch = await _run_github_call(repo.get_branch, repo.default_branch)
+        return branch.commit.sha
+    except Exception as e:
+        logger.warning(f"Could not read HEAD of {repo.full_name}: {e}")
+        return None
 
-@mcp.tool()
-async def start_repository_ingestion(repo_name: str) -> str:
+def _step_up_to_date(repo_name: str, step: str, head_sha: Optional[str]) -> bool:
+    """True if a step already completed against the same default-branch HEAD."""
+    return bool(head_sha) and analysis_results[repo_name].get("head_shas", {}).get(step) == head_sha
+
+# Per-step chunk counts; total_documents is always their sum
+_STEP_COUNT_KEYS = ("docs_stored", "code_chunks_stored", "issues_stored", "prs_stored")
+
+def _record_step_count(state: Dict, key: str, stored: int):
     """
-    Start the repository ingestion process by validating the repository 
-    and setting up the initial state. This is the first step in the 
-    multi-step ingestion workflow.
+    Set a step's chunk count and recompute total_documents from all steps.
+    
+    Deriving the total (rather than adding to it) keeps it correct when a
+    step is re-run, since the step's count replaces its previous value.
+    """
+    state[key] = stored
+    state["total_documents"] = sum(state.get(step_key, 0) for step_key in _STEP_COUNT_KEYS)
+
+async def _fetch_step_data(step: str, repo, limit: Optional[int] = None) -> List:
+    """
+    Run the fetcher registered for an ingestion step.
     
     Args:
-        repo_name: Repository name in 'owner/repo' format (e.g., 'microsoft/vscode')
+        step: One of 'docs', 'code' or 'prs'
+        repo: PyGithub repository object
+        limit: Optional maximum number of items (PRs step)
     
     Returns:
-        Status message with the 4-step ingestion plan
+        List of documents produced by the fetcher
     """
-    try:
-        logger.info(f"🚀 Starting repository ingestion process for: {repo_name}")
-        
-        # Initialize ingestion using our helper function
-        github_client, embeddings, repo, chroma_persist_dir, error_msg = await _initialize_ingestion(repo_name)
-        
-        if error_msg:
-            return error_msg
-        
-        # Update status to in_progress
-        analysis_results[repo_name]["status"] = "in_progress"
-        analysis_results[repo_name]["timestamp"] = datetime.now().isoformat()
-        
-        response_text = f"""🚀 **Repository Ingestion Started!**
-
-📂 **Repository**: {repo.full_name}
+    fetcher, arg_kind = _step_fetchers()[step]
+    arg = repo if arg_kind == "repo" else repo.full_name
+    args = (arg,) if limit is None else (arg, limit)
+    return await fetcher(*args)
+
+# One lock per (repository, step): a repeated call for the same step waits for
+# the running one (and then usually finds it up to date) instead of embedding
+# the same data twice, while other repositories and steps proceed unhindered
+_step_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+def _one_run_per_repo_step(step: str):
+    """Decorate an ingestion step so it runs at most once at a time per repository."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(repo_name: str, *args, **kwargs):
+            lock = _step_locks.setdefault((repo_name, step), asyncio.Lock())
+            async with lock:
+                return await func(repo_name, *args, **kwargs)
+        return wrapper
+    return decorator
+
+# Set while ingest_repository_all runs its steps (the context is copied into each
+# gathered step): the PR step then leaves the final status to the wrapper instead
+# of marking the repository completed while sibling steps are still running
+_ingest_all_running = contextvars.ContextVar("ingest_all_running", default=False)
+
+
+# Banner returned by start_repository_ingestion; it depends only on the repository name
+_START_BANNER_TEMPLATE = """🚀 **Repository Ingestion Started!**
+
+📂 **Repository**: {full_name}
 🎯 **Status**: Initialization Complete - Ready for Step-by-Step Ingestion
 
 📋 **4-Step Ingestion Plan:**
@@ -222,6 +344,42 @@ async def start_repository_ingestion(repo_name: str) -> str:
 
 ✅ **Repository validated and ready for multi-step ingestion!**"""
 
+@functools.lru_cache(maxsize=1024)
+def _start_banner(repo_name: str, full_name: str) -> str:
+    return _START_BANNER_TEMPLATE.format_map({"repo_name": repo_name, "full_name": full_name})
+
+@mcp.tool()
+async def start_repository_ingestion(repo_name: str) -> str:
+    """
+    Start the repository ingestion process by validating the repository 
+    and setting up the initial state. This is the first step in the 
+    multi-step ingestion workflow.
+    
+    Args:
+        repo_name: Repository name in 'owner/repo' format (e.g., 'microsoft/vscode')
+    
+    Returns:
+        Status message with the 4-step ingestion plan
+    """
+    try:
+        logger.info(f"🚀 Starting repository ingestion process for: {repo_name}")
+        
+        # Initialize ingestion using our helper function
+        is_new_entry = repo_name not in analysis_results
+        github_client, embeddings, repo, chroma_persist_dir, error_msg = await _initialize_ingestion(repo_name)
+        
+        if error_msg:
+            return error_msg
+        
+        state = analysis_results[repo_name]
+        
+        # Update status to in_progress (a fresh entry already carries the current timestamp)
+        state["status"] = "in_progress"
+        if not is_new_entry:
+            state["timestamp"] = datetime.now().isoformat()
+        
+        response_text = _start_banner(repo_name, repo.full_name)
+
         logger.info(f"✅ Repository ingestion initialized for {repo_name}")
         return response_text
         
@@ -237,6 +395,7 @@ async def start_repository_ingestion(repo_name: str) -> str:
         return f"❌ **Ingestion Start Failed**: {error_msg}"
 
 @mcp.tool()
+@_one_run_per_repo_step("docs")
 async def ingest_repository_docs(repo_name: str) -> str:
     """
     Ingest documentation from a GitHub repository (Step 1 of 4).
@@ -262,46 +421,72 @@ Repository '{repo_name}' has not been initialized for ingestion yet.
 
 Then proceed with documentation ingestion."""
         
+        state = analysis_results[repo_name]
+        
         # Initialize ingestion clients
         github_client, embeddings, repo, chroma_persist_dir, error_msg = await _initialize_ingestion(repo_name)
         
         if error_msg:
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return error_msg
         
         # Import required function
         try:
-            from issue_solver.ingest import fetch_repo_docs, chunk_and_embed_and_store
+            from issue_solver.ingest import chunk_and_embed_and_store, IncompleteIngestionError
+            from issue_solver.vectorstore import collection_prefix
         except ImportError as e:
             error_msg = f"Failed to import documentation functions: {e}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Import Error**: {error_msg}"
         
         # Collection name for documentation
         COLLECTION_DOCS = "documentation"
         
+        # Nothing to do if the default branch has not moved since the last run
+        head_sha = await _get_head_sha(repo)
+        if _step_up_to_date(repo_name, "docs", head_sha):
+            logger.info(f"⏭️  Documentation unchanged at {head_sha[:7]}, skipping re-ingestion")
+            return f"""✅ **Step 1 Complete: Documentation Already Up to Date**
+
+📚 **Documentation Results:**
+• Repository: {repo.full_name}
+• Default branch HEAD `{head_sha[:7]}` is unchanged since the last ingestion
+• Documents Stored: {state["docs_stored"]:,} chunks
+
+🎯 **Next Step:** Run Step 2 - Code Analysis:
+`ingest_repository_code('{repo_name}')`"""
+        
         # Process documentation
         try:
             logger.info("📄 Fetching documentation files...")
-            docs = await fetch_repo_docs(repo.full_name)
+            docs = await _fetch_step_data("docs", repo)
             
             if docs:
                 logger.info(f"📝 Found {len(docs)} documentation files, now embedding and storing...")
-                stored = await chunk_and_embed_and_store(docs, embeddings, COLLECTION_DOCS, repo.full_name)
+                try:
+                    stored = await chunk_and_embed_and_store(docs, embeddings, COLLECTION_DOCS, repo.full_name,
+                                                             raise_on_failure=True)
+                    failed = 0
+                except IncompleteIngestionError as e:
+                    stored, failed = e.stored, e.failed
                 
                 # Update analysis results
-                analysis_results[repo_name]["docs_stored"] = stored
-                analysis_results[repo_name]["total_documents"] += stored
+                _record_step_count(state, "docs_stored", stored)
                 
                 # Add to collections list
-                safe_repo_name = repo.full_name.replace('/', '_').replace('-', '_').lower()
+                safe_repo_name = collection_prefix(repo.full_name)
                 collection_name = f"{safe_repo_name}_{COLLECTION_DOCS}"
-                if collection_name not in analysis_results[repo_name]["collections"]:
-                    analysis_results[repo_name]["collections"].append(collection_name)
+                if collection_name not in state["collections"]:
+                    state["collections"].append(collection_name)
                 
+                # Only a run that stored every chunk may let later calls at this HEAD skip
+                if head_sha and not failed:
+                    state.setdefault("head_shas", {})["docs"] = head_sha
+                elif failed:
+                    state.get("head_shas", {}).pop("docs", None)
                 logger.info(f"✅ Documentation ingestion completed: {stored} documents")
                 
                 response_text = f"""✅ **Step 1 Complete: Documentation Ingested!**
@@ -310,7 +495,7 @@ Then proceed with documentation ingestion."""
 • Repository: {repo.full_name}
 • Documents Stored: {stored:,} chunks
 • Collection: {collection_name}
-• Status: ✅ Complete
+• Status: {'✅ Complete' if not failed else f'⚠️ {failed:,} chunks failed to store; re-run this step to retry them'}
 
 📊 **Progress Summary:**
 • Step 1 (Docs): ✅ {stored} documents
@@ -327,7 +512,7 @@ Then proceed with documentation ingestion."""
                 
             else:
                 # No documents found, but not an error
-                analysis_results[repo_name]["docs_stored"] = 0
+                _record_step_count(state, "docs_stored", 0)
                 logger.info("ℹ️  No documentation found")
                 
                 response_text = f"""✅ **Step 1 Complete: Documentation Scan Finished**
@@ -351,8 +536,8 @@ Then proceed with documentation ingestion."""
         except Exception as e:
             error_msg = f"Documentation processing error: {str(e)}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Step 1 Failed**: Documentation ingestion error: {error_msg}"
         
     except Exception as e:
@@ -367,6 +552,7 @@ Then proceed with documentation ingestion."""
         return f"❌ **Step 1 Failed**: {error_msg}"
 
 @mcp.tool()
+@_one_run_per_repo_step("code")
 async def ingest_repository_code(repo_name: str) -> str:
     """
     Ingest source code from a GitHub repository (Step 2 of 4).
@@ -392,56 +578,82 @@ Repository '{repo_name}' has not been initialized for ingestion yet.
 
 Then proceed with code ingestion."""
         
+        state = analysis_results[repo_name]
+        
         # Initialize ingestion clients
         github_client, embeddings, repo, chroma_persist_dir, error_msg = await _initialize_ingestion(repo_name)
         
         if error_msg:
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return error_msg
         
         # Import required function
         try:
-            from issue_solver.ingest import fetch_repo_code, chunk_and_embed_and_store
+            from issue_solver.ingest import chunk_and_embed_and_store, IncompleteIngestionError
+            from issue_solver.vectorstore import collection_prefix
         except ImportError as e:
             error_msg = f"Failed to import code analysis functions: {e}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Import Error**: {error_msg}"
         
         # Collection name for repository code
         COLLECTION_REPO_CODE = "repo_code_main"
         
+        # Nothing to do if the default branch has not moved since the last run
+        head_sha = await _get_head_sha(repo)
+        if _step_up_to_date(repo_name, "code", head_sha):
+            logger.info(f"⏭️  Source code unchanged at {head_sha[:7]}, skipping re-ingestion")
+            return f"""✅ **Step 2 Complete: Source Code Already Up to Date**
+
+💻 **Code Analysis Results:**
+• Repository: {repo.full_name}
+• Default branch HEAD `{head_sha[:7]}` is unchanged since the last ingestion
+• Code Chunks Stored: {state["code_chunks_stored"]:,} chunks
+
+🎯 **Next Step:** Run Step 3 - Issues History:
+`ingest_repository_issues('{repo_name}')`"""
+        
         # Process code
         try:
             logger.info("📝 Fetching and analyzing source code...")
-            code_chunks = await fetch_repo_code(repo.full_name)
+            code_chunks = await _fetch_step_data("code", repo)
             
             if code_chunks:
                 logger.info(f"🔍 Found {len(code_chunks)} code chunks, now embedding and storing...")
-                stored = await chunk_and_embed_and_store(code_chunks, embeddings, COLLECTION_REPO_CODE, repo.full_name)
+                try:
+                    stored = await chunk_and_embed_and_store(code_chunks, embeddings, COLLECTION_REPO_CODE, repo.full_name,
+                                                             raise_on_failure=True)
+                    failed = 0
+                except IncompleteIngestionError as e:
+                    stored, failed = e.stored, e.failed
                 
                 # Update analysis results
-                analysis_results[repo_name]["code_chunks_stored"] = stored
-                analysis_results[repo_name]["total_documents"] += stored
+                _record_step_count(state, "code_chunks_stored", stored)
                 
                 # Add to collections list
-                safe_repo_name = repo.full_name.replace('/', '_').replace('-', '_').lower()
+                safe_repo_name = collection_prefix(repo.full_name)
                 collection_name = f"{safe_repo_name}_{COLLECTION_REPO_CODE}"
-                if collection_name not in analysis_results[repo_name]["collections"]:
-                    analysis_results[repo_name]["collections"].append(collection_name)
+                if collection_name not in state["collections"]:
+                    state["collections"].append(collection_name)
                 
+                # Only a run that stored every chunk may let later calls at this HEAD skip
+                if head_sha and not failed:
+                    state.setdefault("head_shas", {})["code"] = head_sha
+                elif failed:
+                    state.get("head_shas", {}).pop("code", None)
                 logger.info(f"✅ Code ingestion completed: {stored} chunks")
                 
-                docs_stored = analysis_results[repo_name]["docs_stored"]
+                docs_stored = state["docs_stored"]
                 response_text = f"""✅ **Step 2 Complete: Source Code Analyzed!**
 
 💻 **Code Analysis Results:**
 • Repository: {repo.full_name}
 • Code Chunks Stored: {stored:,} chunks
 • Collection: {collection_name}
-• Status: ✅ Complete
+• Status: {'✅ Complete' if not failed else f'⚠️ {failed:,} chunks failed to store; re-run this step to retry them'}
 
 📊 **Progress Summary:**
 • Step 1 (Docs): ✅ {docs_stored} documents
@@ -458,10 +670,10 @@ Then proceed with code ingestion."""
                 
             else:
                 # No code found, but not an error
-                analysis_results[repo_name]["code_chunks_stored"] = 0
+                _record_step_count(state, "code_chunks_stored", 0)
                 logger.info("ℹ️  No source code found to analyze")
                 
-                docs_stored = analysis_results[repo_name]["docs_stored"]
+                docs_stored = state["docs_stored"]
                 response_text = f"""✅ **Step 2 Complete: Code Scan Finished**
 
 💻 **Code Analysis Results:**
@@ -483,8 +695,8 @@ Then proceed with code ingestion."""
         except Exception as e:
             error_msg = f"Code processing error: {str(e)}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Step 2 Failed**: Code ingestion error: {error_msg}"
         
     except Exception as e:
@@ -499,6 +711,7 @@ Then proceed with code ingestion."""
         return f"❌ **Step 2 Failed**: {error_msg}"
 
 @mcp.tool()
+@_one_run_per_repo_step("issues")
 async def ingest_repository_issues(repo_name: str, max_issues: int = 100) -> str:
     """
     Ingest issues history from a GitHub repository (Step 3 of 4).
@@ -525,22 +738,25 @@ Repository '{repo_name}' has not been initialized for ingestion yet.
 
 Then proceed with issues ingestion."""
         
+        state = analysis_results[repo_name]
+        
         # Initialize ingestion clients
         github_client, embeddings, repo, chroma_persist_dir, error_msg = await _initialize_ingestion(repo_name)
         
         if error_msg:
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return error_msg
         
         # Import required function
         try:
-            from issue_solver.ingest import fetch_repo_issues, chunk_and_embed_and_store
+            from issue_solver.ingest import chunk_and_embed_and_store_stream, iter_repo_issue_batches_async
+            from issue_solver.vectorstore import collection_prefix
         except ImportError as e:
             error_msg = f"Failed to import issues functions: {e}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Import Error**: {error_msg}"
         
         # Collection name for issues
@@ -548,32 +764,33 @@ Then proceed with issues ingestion."""
         
         # Process issues
         try:
-            logger.info(f"🔍 Fetching up to {max_issues} issues...")
-            issues = await asyncio.to_thread(fetch_repo_issues, repo, max_issues)
+            logger.info(f"🔍 Fetching and embedding up to {max_issues} issues...")
+            # Embed each batch while the next page of issues is being fetched
+            issue_count, stored = await chunk_and_embed_and_store_stream(
+                iter_repo_issue_batches_async(repo, max_issues), embeddings, COLLECTION_ISSUES, repo.full_name
+            )
             
-            if issues:
-                logger.info(f"📊 Found {len(issues)} issues, now embedding and storing...")
-                stored = await chunk_and_embed_and_store(issues, embeddings, COLLECTION_ISSUES, repo.full_name)
+            if issue_count:
+                logger.info(f"📊 Embedded {issue_count} issues")
                 
                 # Update analysis results
-                analysis_results[repo_name]["issues_stored"] = stored
-                analysis_results[repo_name]["total_documents"] += stored
+                _record_step_count(state, "issues_stored", stored)
                 
                 # Add to collections list
-                safe_repo_name = repo.full_name.replace('/', '_').replace('-', '_').lower()
+                safe_repo_name = collection_prefix(repo.full_name)
                 collection_name = f"{safe_repo_name}_{COLLECTION_ISSUES}"
-                if collection_name not in analysis_results[repo_name]["collections"]:
-                    analysis_results[repo_name]["collections"].append(collection_name)
+                if collection_name not in state["collections"]:
+                    state["collections"].append(collection_name)
                 
                 logger.info(f"✅ Issues ingestion completed: {stored} documents")
                 
-                docs_stored = analysis_results[repo_name]["docs_stored"]
-                code_stored = analysis_results[repo_name]["code_chunks_stored"]
+                docs_stored = state["docs_stored"]
+                code_stored = state["code_chunks_stored"]
                 response_text = f"""✅ **Step 3 Complete: Issues History Ingested!**
 
 🐛 **Issues Analysis Results:**
 • Repository: {repo.full_name}
-• Issues Processed: {len(issues)} issues → {stored:,} searchable chunks
+• Issues Processed: {issue_count} issues → {stored:,} searchable chunks
 • Collection: {collection_name}
 • Status: ✅ Complete
 
@@ -594,11 +811,11 @@ Then proceed with issues ingestion."""
                 
             else:
                 # No issues found, but not an error
-                analysis_results[repo_name]["issues_stored"] = 0
+                _record_step_count(state, "issues_stored", 0)
                 logger.info("ℹ️  No issues found")
                 
-                docs_stored = analysis_results[repo_name]["docs_stored"]
-                code_stored = analysis_results[repo_name]["code_chunks_stored"]
+                docs_stored = state["docs_stored"]
+                code_stored = state["code_chunks_stored"]
                 response_text = f"""✅ **Step 3 Complete: Issues Scan Finished**
 
 🐛 **Issues Analysis Results:**
@@ -620,8 +837,8 @@ Then proceed with issues ingestion."""
         except Exception as e:
             error_msg = f"Issues processing error: {str(e)}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Step 3 Failed**: Issues ingestion error: {error_msg}"
         
     except Exception as e:
@@ -636,6 +853,7 @@ Then proceed with issues ingestion."""
         return f"❌ **Step 3 Failed**: {error_msg}"
 
 @mcp.tool()
+@_one_run_per_repo_step("prs")
 async def ingest_repository_prs(repo_name: str, max_prs: int = 50) -> str:
     """
     Ingest PR history from a GitHub repository (Step 4 of 4 - Final Step).
@@ -662,22 +880,25 @@ Repository '{repo_name}' has not been initialized for ingestion yet.
 
 Then proceed with the 4-step ingestion process."""
         
+        state = analysis_results[repo_name]
+        
         # Initialize ingestion clients
         github_client, embeddings, repo, chroma_persist_dir, error_msg = await _initialize_ingestion(repo_name)
         
         if error_msg:
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return error_msg
         
         # Import required function
         try:
-            from issue_solver.ingest import fetch_repo_pr_history, chunk_and_embed_and_store
+            from issue_solver.ingest import chunk_and_embed_and_store
+            from issue_solver.vectorstore import collection_prefix
         except ImportError as e:
             error_msg = f"Failed to import PR functions: {e}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Import Error**: {error_msg}"
         
         # Collection name for PR history
@@ -686,39 +907,47 @@ Then proceed with the 4-step ingestion process."""
         # Process PR history
         try:
             logger.info(f"🔀 Fetching up to {max_prs} pull requests...")
-            pr_history = await asyncio.to_thread(fetch_repo_pr_history, repo, max_prs)
+            pr_history = await _fetch_step_data("prs", repo, max_prs)
             
             if pr_history:
                 logger.info(f"📊 Found {len(pr_history)} PRs, now embedding and storing...")
                 stored = await chunk_and_embed_and_store(pr_history, embeddings, COLLECTION_PR_HISTORY, repo.full_name)
                 
                 # Update analysis results
-                analysis_results[repo_name]["prs_stored"] = stored
-                analysis_results[repo_name]["total_documents"] += stored
+                _record_step_count(state, "prs_stored", stored)
                 
                 # Add to collections list
-                safe_repo_name = repo.full_name.replace('/', '_').replace('-', '_').lower()
+                safe_repo_name = collection_prefix(repo.full_name)
                 collection_name = f"{safe_repo_name}_{COLLECTION_PR_HISTORY}"
-                if collection_name not in analysis_results[repo_name]["collections"]:
-                    analysis_results[repo_name]["collections"].append(collection_name)
+                if collection_name not in state["collections"]:
+                    state["collections"].append(collection_name)
                 
                 logger.info(f"✅ PR ingestion completed: {stored} documents")
                 
             else:
                 # No PRs found, but not an error
-                analysis_results[repo_name]["prs_stored"] = 0
+                _record_step_count(state, "prs_stored", 0)
                 logger.info("ℹ️  No pull requests found")
             
+            if _ingest_all_running.get():
+                return f"""✅ **Step 4 Complete: PR History**
+
+🔄 **PR History Results:**
+• Repository: {repo.full_name}
+• PRs Processed: {len(pr_history) if pr_history else 0} PRs → {state["prs_stored"]:,} searchable chunks
+• Status: ✅ Complete"""
+            
             # **CRUCIAL: Mark ingestion as completed**
-            analysis_results[repo_name]["status"] = "completed"
-            analysis_results[repo_name]["timestamp"] = datetime.now().isoformat()
+            completed_at = datetime.now()
+            state["status"] = "completed"
+            state["timestamp"] = completed_at.isoformat()
             
             # Get all stored counts for final summary
-            docs_stored = analysis_results[repo_name]["docs_stored"]
-            code_stored = analysis_results[repo_name]["code_chunks_stored"]
-            issues_stored = analysis_results[repo_name]["issues_stored"]
-            prs_stored = analysis_results[repo_name]["prs_stored"]
-            total_stored = analysis_results[repo_name]["total_documents"]
+            docs_stored = state["docs_stored"]
+            code_stored = state["code_chunks_stored"]
+            issues_stored = state["issues_stored"]
+            prs_stored = state["prs_stored"]
+            total_stored = state["total_documents"]
             
             response_text = f"""🎉 **INGESTION COMPLETE! All 4 Steps Finished!**
 
@@ -737,10 +966,10 @@ Then proceed with the 4-step ingestion process."""
 
 🎯 **Total Knowledge Base Size:** {total_stored:,} searchable chunks
 📁 **ChromaDB Location:** {chroma_persist_dir}
-🕒 **Completed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+🕒 **Completed:** {completed_at.strftime('%Y-%m-%d %H:%M:%S')}
 
 📁 **Collections Created:**
-{chr(10).join([f"  • {col}" for col in analysis_results[repo_name]["collections"]])}
+{chr(10).join([f"  • {col}" for col in state["collections"]])}
 
 🚀 **Next Steps - Repository is Ready!**
 1. Use `analyze_github_issue_tool` to analyze specific issues from {repo.full_name}
@@ -760,8 +989,8 @@ Then proceed with the 4-step ingestion process."""
         except Exception as e:
             error_msg = f"PR processing error: {str(e)}"
             logger.error(error_msg)
-            analysis_results[repo_name]["status"] = "error"
-            analysis_results[repo_name]["error_message"] = error_msg
+            state["status"] = "error"
+            state["error_message"] = error_msg
             return f"❌ **Step 4 Failed**: PR ingestion error: {error_msg}"
         
     except Exception as e:
@@ -775,6 +1004,164 @@ Then proceed with the 4-step ingestion process."""
         
         return f"❌ **Step 4 Failed**: {error_msg}"
 
+# Maximum number of ingestion steps ingest_repository_all runs at the same time
+MAX_CONCURRENT_STEPS = int(os.getenv("MAX_CONCURRENT_STEPS", "4"))
+
+@mcp.tool()
+async def ingest_repository_all(repo_name: str, max_issues: int = 100, max_prs: int = 50) -> str:
+    """
+    Run the complete ingestion (docs, code, issues and PRs) in one call.
+    The four steps use independent GitHub endpoints and Chroma collections,
+    so they run concurrently instead of one after another.
+    
+    Args:
+        repo_name: Repository name in 'owner/repo' format
+        max_issues: Maximum number of issues to process (default: 100)
+        max_prs: Maximum number of PRs to process (default: 50)
+    
+    Returns:
+        Combined status message for all four ingestion steps
+    """
+    try:
+        logger.info(f"🚀 Starting concurrent ingestion for: {repo_name}")
+        start_mono = time.monotonic()
+        
+        # Validates the repository and warms the shared clients before the steps fan out
+        start_result = await start_repository_ingestion(repo_name)
+        if repo_name not in analysis_results or analysis_results[repo_name]["status"] == "error":
+            return start_result
+        
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_STEPS)
+        
+        async def run_step(step_coro):
+            async with semaphore:
+                return await step_coro
+        
+        step_names = ["Documentation", "Source Code", "Issues History", "PR History"]
+        # Steps skip their own completion transition; the status is set once below
+        token = _ingest_all_running.set(True)
+        try:
+            results = await asyncio.gather(
+                run_step(ingest_repository_docs(repo_name)),
+                run_step(ingest_repository_code(repo_name)),
+                run_step(ingest_repository_issues(repo_name, max_issues)),
+                run_step(ingest_repository_prs(repo_name, max_prs)),
+                return_exceptions=True
+            )
+        finally:
+            _ingest_all_running.reset(token)
+        
+        # Steps report failures as '❌' messages
+        failed_steps = [
+            name for name, result in zip(step_names, results)
+            if isinstance(result, BaseException) or str(result).startswith("❌")
+        ]
+        state = analysis_results[repo_name]
+        if failed_steps:
+            state["status"] = "error"
+            state["error_message"] = f"Failed steps: {', '.join(failed_steps)}"
+        else:
+            state["status"] = "completed"
+        state["timestamp"] = datetime.now().isoformat()
+        elapsed = time.monotonic() - start_mono
+        
+        step_reports = "\n\n---\n\n".join(
+            f"❌ **{name} Failed**: {result}" if isinstance(result, BaseException) else result
+            for name, result in zip(step_names, results)
+        )
+        header = (
+            f"❌ **Ingestion finished with errors** ({', '.join(failed_steps)})"
+            if failed_steps else
+            f"🎉 **All 4 ingestion steps finished for {repo_name}** in {elapsed:.1f}s"
+        )
+        logger.info(f"🏁 Concurrent ingestion finished for {repo_name} in {elapsed:.1f}s ({len(failed_steps)} failed steps)")
+        return f"{header}\n\n{step_reports}"
+        
+    except Exception as e:
+        error_msg = f"Concurrent ingestion failed: {str(e)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        
+        if repo_name in analysis_results:
+            analysis_results[repo_name]["status"] = "error"
+            analysis_results[repo_name]["error_message"] = error_msg
+        
+        return f"❌ **Ingestion Failed**: {error_msg}"
+
+# Maximum number of repositories ingest_repositories ingests at the same time
+MAX_CONCURRENT_REPOS = int(os.getenv("MAX_CONCURRENT_REPOS", "2"))
+
+@mcp.tool()
+async def ingest_repositories(repo_names: List[str], max_issues: int = 100, max_prs: int = 50) -> str:
+    """
+    Fully ingest several repositories in one call.
+    Repositories run concurrently (bounded by MAX_CONCURRENT_REPOS), each
+    through ingest_repository_all; GitHub calls from all of them share one
+    rate limiter.
+    
+    Args:
+        repo_names: Repository names in 'owner/repo' format
+        max_issues: Maximum number of issues to process per repository (default: 100)
+        max_prs: Maximum number of PRs to process per repository (default: 50)
+    
+    Returns:
+        Per-repository summary of the ingestion results
+    """
+    # Preserve order while dropping duplicates, which would race on the same collections
+    repo_names = list(dict.fromkeys(repo_names))
+    if not repo_names:
+        return "❌ **No repositories given**: pass one or more names in 'owner/repo' format."
+    
+    logger.info(f"🚀 Starting ingestion of {len(repo_names)} repositories")
+    start_mono = time.monotonic()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REPOS)
+    
+    async def ingest_one(name):
+        async with semaphore:
+            return await ingest_repository_all(name, max_issues, max_prs)
+    
+    results = await asyncio.gather(*(ingest_one(name) for name in repo_names), return_exceptions=True)
+    
+    lines = []
+    failed = 0
+    for name, result in zip(repo_names, results):
+        status = analysis_results.get(name, {}).get("status")
+        if isinstance(result, BaseException) or status != "completed":
+            failed += 1
+            reason = result if isinstance(result, BaseException) else analysis_results.get(name, {}).get("error_message")
+            lines.append(f"• {name}: ❌ Failed ({reason or 'see get_repository_status'})")
+        else:
+            lines.append(f"• {name}: ✅ {analysis_results[name]['total_documents']:,} chunks stored")
+    
+    elapsed = time.monotonic() - start_mono
+    logger.info(f"🏁 Multi-repository ingestion finished in {elapsed:.1f}s ({failed} failed)")
+    header = (
+        f"❌ **Ingested {len(repo_names) - failed} of {len(repo_names)} repositories**"
+        if failed else
+        f"🎉 **Ingested all {len(repo_names)} repositories**"
+    )
+    return f"""{header} in {elapsed:.1f}s
+
+{chr(10).join(lines)}
+
+💡 **Tip:** Use `get_repository_status('<owner/repo>')` for per-step details."""
+
+# GitHub issue fetches in flight, keyed by (owner, repo, number); concurrent
+# analyses of the same issue share one request instead of each sending their own
+_issue_fetches: Dict[Tuple[str, str, int], asyncio.Future] = {}
+
+async def _fetch_issue_coalesced(owner: str, repo: str, issue_number: int):
+    """Fetch a GitHub issue, joining any fetch of the same issue already running."""
+    from issue_solver.analyze import get_github_issue
+
+    key = (owner.lower(), repo.lower(), issue_number)
+    fetch = _issue_fetches.get(key)
+    if fetch is None:
+        fetch = asyncio.ensure_future(asyncio.to_thread(get_github_issue, owner, repo, issue_number))
+        _issue_fetches[key] = fetch
+        fetch.add_done_callback(lambda _: _issue_fetches.pop(key, None))
+    # Shielded so a cancelled caller does not cancel the fetch for the others
+    return await asyncio.shield(fetch)
+
 @mcp.tool()
 async def analyze_github_issue_tool(issue_url: str) -> dict:
     """
@@ -795,7 +1182,6 @@ async def analyze_github_issue_tool(issue_url: str) -> dict:
         try:
             from issue_solver.analyze import (
                 parse_github_url, 
-                get_github_issue, 
                 create_langchain_agent, 
                 parse_agent_output, 
                 append_to_google_doc
@@ -837,7 +1223,7 @@ async def analyze_github_issue_tool(issue_url: str) -> dict:
         
         # Fetch the GitHub issue
         try:
-            issue = await asyncio.to_thread(get_github_issue, owner, repo, issue_number)
+            issue = await _fetch_issue_coalesced(owner, repo, issue_number)
             logger.info(f"✅ Fetched issue: {issue.title}")
         except Exception as e:
             logger.error(f"Issue fetch error: {e}")
@@ -874,7 +1260,7 @@ async def analyze_github_issue_tool(issue_url: str) -> dict:
         timestamp = datetime.now().strftime('%d %B, %Y at %H:%M')
         detailed_report = f"""---
 ### Issue #{issue.number}: {issue.title}
-- Repository: {issue.repository.full_name}
+- Repository: {repo_full_name}
 - Link: {issue.html_url}
 - Analyzed On: {timestamp}
 - Status: {issue.state}
@@ -909,7 +1295,7 @@ async def analyze_github_issue_tool(issue_url: str) -> dict:
             "issue_info": {
                 "number": issue.number,
                 "title": issue.title,
-                "repository": issue.repository.full_name,
+                "repository": repo_full_name,
                 "url": issue.html_url,
                 "status": issue.state,
                 "analyzed_on": timestamp
@@ -930,8 +1316,88 @@ async def analyze_github_issue_tool(issue_url: str) -> dict:
             "success": False
         }  # Return Python object, not JSON string
 
+# Concurrent patch requests for the same repository are coalesced into one
+# generate_patches_for_issues call, sharing store setup and one batched LLM call
+PATCH_BATCH_SIZE = int(os.getenv("PATCH_BATCH_SIZE", "8"))
+PATCH_BATCH_WAIT_MS = float(os.getenv("PATCH_BATCH_WAIT_MS", "25"))
+
+class _PatchBatcher:
+    """Collect patch requests per (repo, use_cache) for a short window, then run them together."""
+    
+    def __init__(self, max_batch: int = PATCH_BATCH_SIZE, max_wait_ms: float = PATCH_BATCH_WAIT_MS):
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[Tuple[str, bool], List[Tuple[str, asyncio.Future]]] = {}
+        # The loop keeps only weak references to tasks; hold running batches until done
+        self._tasks: set = set()
+    
+    async def submit(self, issue_body: str, repo_full_name: str, use_cache: bool = True) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        key = (repo_full_name, use_cache)
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((issue_body, future))
+        if len(batch) >= self._max_batch:
+            self._flush(key, batch)
+        elif len(batch) == 1:
+            loop.call_later(self._max_wait, self._flush, key, batch)
+        return await future
+    
+    def _flush(self, key: Tuple[str, bool], batch: List[Tuple[str, asyncio.Future]]):
+        # The timer of a batch that was already flushed early must not flush its successor
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        task = asyncio.create_task(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, key: Tuple[str, bool], batch: List[Tuple[str, asyncio.Future]]):
+        repo_full_name, use_cache = key
+        try:
+            from issue_solver.patch import generate_patches_for_issues
+            if len(batch) > 1:
+                logger.info("📦 Generating %d patches for %s in one batch", len(batch), repo_full_name)
+            results = await asyncio.to_thread(
+                generate_patches_for_issues, [body for body, _ in batch], repo_full_name, use_cache
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        # A short result list must not leave the remaining callers waiting forever
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError(
+                    f"Patch generation returned {len(results)} results for {len(batch)} issues"
+                ))
+
+_patch_batcher = _PatchBatcher()
+
+# Summary returned when patch generation finds no specific files to change
+_FALLBACK_SUMMARY_TEMPLATE = (
+    "Analysis completed for repository {repo}. "
+    "The issue requires manual investigation. "
+    "Review the repository structure and implement appropriate changes based on the issue description: {issue_snippet}..."
+)
+
+def _with_fallback_summary(patch_data: Dict[str, Any], issue_body: str, repo_full_name: str) -> Dict[str, Any]:
+    """Replace a patch with no files to update by general guidance."""
+    if patch_data.get("filesToUpdate"):
+        return patch_data
+    return {
+        "filesToUpdate": [],
+        "summaryOfChanges": _FALLBACK_SUMMARY_TEMPLATE.format_map(
+            {"repo": repo_full_name, "issue_snippet": issue_body[:200]}
+        )
+    }
+
 @mcp.tool()
-async def generate_code_patch_tool(issue_body: str, repo_full_name: str) -> dict:
+async def generate_code_patch_tool(issue_body: str, repo_full_name: str, use_cache: bool = True) -> dict:
     """
     Generate code patches to resolve a GitHub issue using RAG and AI.
     Analyzes the issue against repository knowledge base and creates
@@ -940,22 +1406,13 @@ async def generate_code_patch_tool(issue_body: str, repo_full_name: str) -> dict
     Args:
         issue_body: The issue description/body text to generate patches for
         repo_full_name: Repository name in 'owner/repo' format
+        use_cache: Reuse the cached patch of an identical issue (default: True)
     
     Returns:
         JSON string containing patch data with filesToUpdate and summaryOfChanges
     """
     try:
-        logger.info(f"🔧 Generating code patch for repo: {repo_full_name}")
-        
-        # Import required modules locally
-        try:
-            from issue_solver.patch import generate_patch_for_issue
-        except ImportError as e:
-            logger.error(f"Failed to import patch modules: {e}")
-            return {
-                "error": f"Import Error: Could not load patch generation modules. Error: {str(e)}",
-                "success": False
-            }
+        logger.info("🔧 Generating code patch for repo: %s", repo_full_name)
         
         # Check if repository is ingested
         if repo_full_name not in analysis_results:
@@ -967,8 +1424,8 @@ async def generate_code_patch_tool(issue_body: str, repo_full_name: str) -> dict
         
         # Generate patch using existing function
         try:
-            logger.info(f"🔍 Generating patches using repository knowledge base for {repo_full_name}")
-            patch_data = await asyncio.to_thread(generate_patch_for_issue, issue_body, repo_full_name)
+            logger.info("🔍 Generating patches using repository knowledge base for %s", repo_full_name)
+            patch_data = await _patch_batcher.submit(issue_body, repo_full_name, use_cache)
             logger.info("✅ Patch generation completed")
             
             # Check if patch generation produced valid results
@@ -985,12 +1442,7 @@ async def generate_code_patch_tool(issue_body: str, repo_full_name: str) -> dict
             if not files_to_update:
                 logger.info("ℹ️ No specific file patches generated - creating general guidance")
                 # Provide a fallback response with general guidance
-                patch_data = {
-                    "filesToUpdate": [],
-                    "summaryOfChanges": f"Analysis completed for repository {repo_full_name}. " +
-                                     f"The issue requires manual investigation. " +
-                                     f"Review the repository structure and implement appropriate changes based on the issue description: {issue_body[:200]}..."
-                }
+                patch_data = _with_fallback_summary(patch_data, issue_body, repo_full_name)
             
             # Enhance patch data with metadata
             enhanced_patch_data = {
@@ -1005,7 +1457,7 @@ async def generate_code_patch_tool(issue_body: str, repo_full_name: str) -> dict
                 }
             }
             
-            logger.info(f"📊 Patch generation summary - Files to update: {len(files_to_update)}")
+            logger.info("📊 Patch generation summary - Files to update: %d", len(files_to_update))
             return enhanced_patch_data  # Return Python object, not JSON string
             
         except Exception as e:
@@ -1023,6 +1475,77 @@ async def generate_code_patch_tool(issue_body: str, repo_full_name: str) -> dict
             "success": False
         }  # Return Python object, not JSON string
 
+@mcp.tool()
+async def generate_code_patches_tool(issue_bodies: List[str], repo_full_name: str, use_cache: bool = True) -> dict:
+    """
+    Generate code patches for several issues of one repository in a single call.
+    The knowledge base is opened once and the LLM prompts are sent as one batch,
+    which is much faster than calling generate_code_patch_tool per issue.
+    
+    Args:
+        issue_bodies: The issue descriptions/body texts to generate patches for
+        repo_full_name: Repository name in 'owner/repo' format
+        use_cache: Reuse the cached patch of an identical issue (default: True)
+    
+    Returns:
+        Patch data (filesToUpdate and summaryOfChanges) per issue, in input order
+    """
+    try:
+        logger.info("🔧 Generating %d code patches for repo: %s", len(issue_bodies), repo_full_name)
+        
+        if not issue_bodies:
+            return {
+                "error": "No issue bodies provided",
+                "success": False
+            }
+        
+        # Check if repository is ingested
+        if repo_full_name not in analysis_results:
+            return {
+                "error": f"Repository '{repo_full_name}' has not been ingested yet. Please run 'ingest_repository_tool' first.",
+                "success": False,
+                "suggestion": f"Run: ingest_repository_tool('{repo_full_name}')"
+            }
+        
+        from issue_solver.patch import generate_patches_for_issues
+        patches = await asyncio.to_thread(generate_patches_for_issues, issue_bodies, repo_full_name, use_cache)
+        
+        results = []
+        for issue_body, patch_data in zip(issue_bodies, patches):
+            if not patch_data or not isinstance(patch_data, dict):
+                results.append({
+                    "error": "Patch generation failed - no valid patches generated",
+                    "success": False
+                })
+                continue
+            files_modified = len(patch_data.get("filesToUpdate", []))
+            results.append({
+                "success": True,
+                "patch_data": _with_fallback_summary(patch_data, issue_body, repo_full_name),
+                "files_modified": files_modified,
+                "has_patches": files_modified > 0
+            })
+        
+        logger.info("📊 Bulk patch generation complete - %d/%d succeeded", sum(r["success"] for r in results), len(results))
+        return {
+            "success": True,
+            "results": results,
+            "metadata": {
+                "repo_name": repo_full_name,
+                "generated_on": datetime.now().isoformat(),
+                "issue_count": len(issue_bodies),
+                "ingestion_info": analysis_results.get(repo_full_name, {})
+            }
+        }
+        
+    except Exception as e:
+        error_msg = f"Bulk code patch generation failed: {str(e)}"
+        logger.error("%s\n%s", error_msg, traceback.format_exc())
+        return {
+            "error": error_msg,
+            "success": False
+        }
+
 
 
 @mcp.tool()
@@ -1042,22 +1565,24 @@ async def get_repository_info(repo_name: str) -> str:
         
         # Import required modules locally
         try:
-            from issue_solver.ingest import initialize_clients
+            from issue_solver.ingest import get_github_client
         except ImportError as e:
             logger.error(f"Failed to import validation modules: {e}")
             return f"❌ **Import Error**: Could not load validation modules.\nError: {str(e)}"
         
         # Get repository information
         try:
-            github_client, _ = await asyncio.to_thread(initialize_clients)
+            github_client = get_github_client()
             repo = await asyncio.to_thread(lambda: github_client.get_repo(repo_name))
             
-            # Get branch information
-            try:
-                branches = list(repo.get_branches())
-                branch_names = [branch.name for branch in branches[:10]]  # First 10 branches
-            except:
-                branch_names = ["Unable to fetch branches"]
+            # Branches and topics are independent requests; fetch them concurrently
+            branches, topics = await asyncio.gather(
+                _run_github_call(lambda: [branch.name for branch in itertools.islice(repo.get_branches(), 10)]),  # First 10 branches
+                _run_github_call(repo.get_topics),
+                return_exceptions=True
+            )
+            branch_names = ["Unable to fetch branches"] if isinstance(branches, Exception) else branches
+            topic_names = [] if isinstance(topics, Exception) else topics
             
             response_text = f"""📋 **Repository Information: {repo_name}**
 
@@ -1073,6 +1598,7 @@ async def get_repository_info(repo_name: str) -> str:
 • Issues: {repo.open_issues_count:,} open
 • Last Updated: {repo.updated_at.strftime('%Y-%m-%d %H:%M:%S')}
 • Visibility: {'Private' if repo.private else 'Public'}
+• Topics: {', '.join(topic_names) or 'None'}
 
 🌿 **Branches:**
 • Default: {repo.default_branch}
@@ -1138,6 +1664,13 @@ async def get_repository_status(repo_name: str) -> str:
         
         # Get stored metadata with enhanced structure
         metadata = analysis_results[repo_name]
+        
+        # Reuse the last rendered status if nothing changed since
+        snapshot = _status_snapshot(metadata)
+        cached = _status_cache.get(repo_name)
+        if cached and cached[0] == snapshot:
+            return cached[1]
+        
         status = metadata.get("status", "unknown")
         
         # Prepare status icon and description
@@ -1164,19 +1697,14 @@ async def get_repository_status(repo_name: str) -> str:
         prs_stored = metadata.get("prs_stored", 0)
         total_documents = metadata.get("total_documents", 0)
         
-        # Determine which steps are complete
-        step1_status = "✅ Complete" if docs_stored >= 0 and "docs_stored" in metadata else "⏳ Pending"
-        step2_status = "✅ Complete" if code_stored >= 0 and "code_chunks_stored" in metadata else "⏳ Pending"
-        step3_status = "✅ Complete" if issues_stored >= 0 and "issues_stored" in metadata else "⏳ Pending"
-        step4_status = "✅ Complete" if prs_stored >= 0 and "prs_stored" in metadata else "⏳ Pending"
+        # Determine which steps are complete (one membership test per step)
+        step_done = [key in metadata for key in _STEP_COUNT_KEYS]
+        step1_status, step2_status, step3_status, step4_status = [
+            "✅ Complete" if done else "⏳ Pending" for done in step_done
+        ]
         
         # Calculate completion percentage
-        completed_steps = sum([
-            1 if "docs_stored" in metadata else 0,
-            1 if "code_chunks_stored" in metadata else 0,
-            1 if "issues_stored" in metadata else 0,
-            1 if "prs_stored" in metadata else 0
-        ])
+        completed_steps = sum(step_done)
         completion_pct = (completed_steps / 4) * 100
         
         # Build progress bar
@@ -1264,6 +1792,7 @@ async def get_repository_status(repo_name: str) -> str:
 • Restart completely with `start_repository_ingestion('{repo_name}')`
 • Check logs for more detailed error information"""
         
+        _status_cache[repo_name] = (snapshot, status_text)
         return status_text
         
     except Exception as e:
@@ -1288,7 +1817,7 @@ async def validate_repository_tool(repo_name: str) -> str:
         
         # Import required modules locally
         try:
-            from issue_solver.ingest import validate_repo_exists, initialize_clients
+            from issue_solver.ingest import validate_repo_exists, get_repo_cached
         except ImportError as e:
             logger.error(f"Failed to import validation modules: {e}")
             return f"❌ **Import Error**: Could not load validation modules.\nError: {str(e)}"
@@ -1300,8 +1829,8 @@ async def validate_repository_tool(repo_name: str) -> str:
             if is_valid:
                 # Try to get additional repository info
                 try:
-                    github_client, _ = await asyncio.to_thread(initialize_clients)
-                    repo = await asyncio.to_thread(lambda: github_client.get_repo(repo_name))
+                    # Reuses the lookup validate_repo_exists just made
+                    repo = await asyncio.to_thread(get_repo_cached, repo_name)
                     
                     response_text = f"""✅ **Repository Validation Successful**
 
@@ -1444,10 +1973,10 @@ async def get_repository_structure(repo_name: str, max_files: int = 50) -> str:
         try:
             # Import required modules locally
             from issue_solver.ingest import get_repo_stats, CHROMA_PERSIST_DIR
-            import chromadb
+            from issue_solver.vectorstore import get_chroma_client, collection_prefix
             
             # Get repository-specific collection names
-            safe_repo_name = repo_name.replace('/', '_').replace('-', '_').lower()
+            safe_repo_name = collection_prefix(repo_name)
             collections = [
                 f"{safe_repo_name}_documentation",
                 f"{safe_repo_name}_repo_code_main",
@@ -1463,15 +1992,15 @@ async def get_repository_structure(repo_name: str, max_files: int = 50) -> str:
                 "recent_issues": []
             }
             
-            # Access ChromaDB to get file information
-            chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+            # Access ChromaDB to get file information (opening the store and reading are blocking)
+            chroma_client = await asyncio.to_thread(get_chroma_client, CHROMA_PERSIST_DIR)
             
             # Get code structure from repo_code_main collection
             try:
-                code_collection = chroma_client.get_collection(f"{safe_repo_name}_repo_code_main")
+                code_collection = await asyncio.to_thread(chroma_client.get_collection, f"{safe_repo_name}_repo_code_main")
                 
                 # Get some documents to analyze structure
-                results = code_collection.get(limit=max_files, include=["metadatas"])
+                results = await asyncio.to_thread(code_collection.get, limit=max_files, include=["metadatas"])
                 
                 for metadata in results["metadatas"]:
                     file_path = metadata.get("filePath", "")
@@ -1493,8 +2022,8 @@ async def get_repository_structure(repo_name: str, max_files: int = 50) -> str:
             
             # Get documentation files
             try:
-                docs_collection = chroma_client.get_collection(f"{safe_repo_name}_documentation")
-                docs_results = docs_collection.get(limit=10, include=["metadatas"])
+                docs_collection = await asyncio.to_thread(chroma_client.get_collection, f"{safe_repo_name}_documentation")
+                docs_results = await asyncio.to_thread(docs_collection.get, limit=10, include=["metadatas"])
                 
                 for metadata in docs_results["metadatas"]:
                     doc_source = metadata.get("source", "")
@@ -1543,6 +2072,63 @@ async def get_repository_structure(repo_name: str, max_files: int = 50) -> str:
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
         return f"❌ **Error**: {error_msg}"
 
+# Keyword buckets for get_patch_guidance, highest priority first
+_ISSUE_TYPE_KEYWORDS = (
+    ("authentication", ("auth", "login", "authentication", "user", "session")),
+    ("api", ("api", "endpoint", "request", "response", "http")),
+    ("ui_component", ("ui", "component", "layout", "design", "css", "style")),
+)
+_ISSUE_TYPE_PRIORITY = {issue_type: rank for rank, (issue_type, _) in enumerate(_ISSUE_TYPE_KEYWORDS)}
+
+def _build_issue_type_automaton():
+    """Aho-Corasick automaton over every keyword, or None if pyahocorasick is not installed."""
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+    automaton = ahocorasick.Automaton()
+    for issue_type, keywords in _ISSUE_TYPE_KEYWORDS:
+        for keyword in keywords:
+            # Keep the highest-priority type for keywords shared by buckets
+            if keyword not in automaton:
+                automaton.add_word(keyword, issue_type)
+    automaton.make_automaton()
+    return automaton
+
+_ISSUE_TYPE_AUTOMATON = _build_issue_type_automaton()
+
+# Without pyahocorasick, one compiled alternation per bucket replaces the
+# per-keyword substring checks with a single C-level search
+_ISSUE_TYPE_PATTERNS = tuple(
+    (issue_type, re.compile("|".join(map(re.escape, keywords))))
+    for issue_type, keywords in _ISSUE_TYPE_KEYWORDS
+)
+
+@functools.lru_cache(maxsize=256)
+def _classify_issue_type(issue_lower: str) -> str:
+    """
+    Classify an issue description as 'authentication', 'api', 'ui_component'
+    or 'general' by substring keyword match, earlier buckets winning. With
+    pyahocorasick installed this is a single pass over the text.
+
+    Callers must lowercase the text. Results are cached, so retried guidance
+    requests for the same description skip the scan.
+    """
+    if _ISSUE_TYPE_AUTOMATON is None:
+        for issue_type, pattern in _ISSUE_TYPE_PATTERNS:
+            if pattern.search(issue_lower):
+                return issue_type
+        return "general"
+    
+    best_type, best_rank = "general", len(_ISSUE_TYPE_KEYWORDS)
+    for _, issue_type in _ISSUE_TYPE_AUTOMATON.iter(issue_lower):
+        rank = _ISSUE_TYPE_PRIORITY[issue_type]
+        if rank < best_rank:
+            best_type, best_rank = issue_type, rank
+            if rank == 0:
+                break
+    return best_type
+
 @mcp.tool()
 async def get_patch_guidance(repo_name: str, issue_description: str) -> str:
     """
@@ -1577,11 +2163,12 @@ Please first run: `ingest_repository_tool('{repo_name}')` to build the knowledge
             
             # Get relevant context from the knowledge base
             try:
-                retriever_tool = initialize_chroma_retriever(repo_name)
-                context_results = retriever_tool.invoke({"query": issue_description})
+                # Embedding the query and searching Chroma block, so run them off the event loop
+                retriever_tool = await asyncio.to_thread(initialize_chroma_retriever, repo_name)
+                context_results = await asyncio.to_thread(retriever_tool.invoke, {"query": issue_description})
                 
                 # Analyze the issue type and provide specific guidance
-                issue_lower = issue_description.lower()
+                issue_type = _classify_issue_type(issue_description.lower())
                 
                 guidance = f"""🧭 **Implementation Guidance: {repo_name}**
 
@@ -1597,7 +2184,7 @@ Please first run: `ingest_repository_tool('{repo_name}')` to build the knowledge
 """
 
                 # Provide specific guidance based on issue type
-                if any(word in issue_lower for word in ["auth", "login", "authentication", "user", "session"]):
+                if issue_type == "authentication":
                     guidance += """
 🔐 **Authentication Issue Detected**
 
@@ -1625,7 +2212,7 @@ Please first run: `ingest_repository_tool('{repo_name}')` to build the knowledge
    - `components/Nav*`, `components/Auth*`
 """
                 
-                elif any(word in issue_lower for word in ["api", "endpoint", "request", "response", "http"]):
+                elif issue_type == "api":
                     guidance += """
 🌐 **API/Endpoint Issue Detected**
 
@@ -1648,7 +2235,7 @@ Please first run: `ingest_repository_tool('{repo_name}')` to build the knowledge
    - Files to examine: README.md, docs/, api-docs/
 """
 
-                elif any(word in issue_lower for word in ["ui", "component", "layout", "design", "css", "style"]):
+                elif issue_type == "ui_component":
                     guidance += """
 🎨 **UI/Component Issue Detected**
 
@@ -1796,9 +2383,9 @@ Repository '{repo_name}' has not been ingested or does not exist in the knowledg
         # Clear ChromaDB collections
         try:
             from issue_solver.ingest import CHROMA_PERSIST_DIR
-            import chromadb
+            from issue_solver.vectorstore import get_chroma_client, collection_prefix
             
-            safe_repo_name = repo_name.replace('/', '_').replace('-', '_').lower()
+            safe_repo_name = collection_prefix(repo_name)
             collections_to_delete = [
                 f"{safe_repo_name}_documentation",
                 f"{safe_repo_name}_issues_history", 
@@ -1806,12 +2393,12 @@ Repository '{repo_name}' has not been ingested or does not exist in the knowledg
                 f"{safe_repo_name}_pr_history"
             ]
             
-            chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+            chroma_client = await asyncio.to_thread(get_chroma_client, CHROMA_PERSIST_DIR)
             deleted_collections = []
             
             for collection_name in collections_to_delete:
                 try:
-                    chroma_client.delete_collection(collection_name)
+                    await asyncio.to_thread(chroma_client.delete_collection, collection_name)
                     deleted_collections.append(collection_name)
                     logger.info(f"Deleted ChromaDB collection: {collection_name}")
                 except Exception as e:
@@ -1819,6 +2406,12 @@ Repository '{repo_name}' has not been ingested or does not exist in the knowledg
             
             # Remove from analysis results
             del analysis_results[repo_name]
+            _status_cache.pop(repo_name, None)
+            try:
+                from issue_solver.patch import get_patch_cache
+                get_patch_cache().invalidate(repo_name)
+            except ImportError:
+                pass
             
             return f"""✅ **Repository Data Cleared Successfully**
 
@@ -1866,9 +2459,12 @@ def main():
         logger.info("    • ingest_repository_code - Step 2: Analyze source code")
         logger.info("    • ingest_repository_issues - Step 3: Process issues history")
         logger.info("    • ingest_repository_prs - Step 4: Analyze PR history (completes ingestion)")
+        logger.info("    • ingest_repository_all - Run all 4 steps concurrently")
+        logger.info("    • ingest_repositories - Fully ingest several repositories concurrently")
         logger.info("  📊 Analysis & Patching Tools:")
         logger.info("    • analyze_github_issue_tool - Analyze issues using RAG")
         logger.info("    • generate_code_patch_tool - Generate patches for issues")
+        logger.info("    • generate_code_patches_tool - Generate patches for several issues in one batch")
 
         logger.info("  📋 Repository Management Tools:")
         logger.info("    • get_repository_status - Check detailed ingestion progress")
@@ -1882,6 +2478,14 @@ def main():
         logger.info("🎯 Ready to accept MCP connections!")
         logger.info("💡 New Workflow: Start with 'start_repository_ingestion' then run 4 ingestion steps!")
         
+        # Prefer uvloop's libuv-based event loop when available (not on Windows)
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            logger.info("⚡ Using uvloop event loop")
+        except ImportError:
+            logger.info("ℹ️  uvloop not installed, using default asyncio event loop")
+        
         # Run the FastMCP server with stdio transport
         mcp.run(transport='stdio')
         
@@ -5,29 +5,56 @@ This package contains the main logic for ingesting repositories, analyzing issue
 generating patches, and managing the MCP server.
 """
 
-from .analyze import (
-    parse_github_url,
-    get_github_issue,
-    create_langchain_agent,
-    parse_agent_output,
-    append_to_google_doc,
-)
-
-from .ingest import (
-    initialize_clients as init_ingestion_clients,
-    fetch_repo_docs,
-    fetch_repo_issues,
-    fetch_repo_code,
-    fetch_repo_pr_history,
-    chunk_and_embed_and_store,
-)
-
-from .patch import (
-    initialize_chroma_clients,
-    generate_patch_for_issue,
-)
-
-from .server import mcp
+import importlib
+
+# Public names resolved on first access (PEP 562), so importing one submodule,
+# e.g. issue_solver.ratelimit from the MCP server, does not load the LLM,
+# vector store and Google API stacks of the others.
+_LAZY_EXPORTS = {
+    # analyze
+    "parse_github_url": (".analyze", "parse_github_url"),
+    "get_github_issue": (".analyze", "get_github_issue"),
+    "create_langchain_agent": (".analyze", "create_langchain_agent"),
+    "parse_agent_output": (".analyze", "parse_agent_output"),
+    "append_to_google_doc": (".analyze", "append_to_google_doc"),
+    # ingest
+    "init_ingestion_clients": (".ingest", "initialize_clients"),
+    "fetch_repo_docs": (".ingest", "fetch_repo_docs"),
+    "fetch_repo_issues": (".ingest", "fetch_repo_issues"),
+    "iter_repo_issue_batches": (".ingest", "iter_repo_issue_batches"),
+    "iter_repo_issue_batches_async": (".ingest", "iter_repo_issue_batches_async"),
+    "fetch_repo_code": (".ingest", "fetch_repo_code"),
+    "fetch_repo_pr_history": (".ingest", "fetch_repo_pr_history"),
+    "fetch_repo_pr_history_async": (".ingest", "fetch_repo_pr_history_async"),
+    "chunk_and_embed_and_store": (".ingest", "chunk_and_embed_and_store"),
+    "chunk_and_embed_and_store_stream": (".ingest", "chunk_and_embed_and_store_stream"),
+    # patch
+    "initialize_chroma_clients": (".patch", "initialize_chroma_clients"),
+    "generate_patch_for_issue": (".patch", "generate_patch_for_issue"),
+    "generate_patches_for_issues": (".patch", "generate_patches_for_issues"),
+    # embeddings
+    "get_embeddings": (".embeddings", "get_embeddings"),
+    # ratelimit
+    "GitHubRateLimiter": (".ratelimit", "GitHubRateLimiter"),
+    "get_github_rate_limiter": (".ratelimit", "get_github_rate_limiter"),
+    # server
+    "mcp": (".server", "mcp"),
+}
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _LAZY_EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    # Cache on the package so later lookups bypass __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
 
 __all__ = [
     # analyze
@@ -40,12 +67,22 @@ __all__ = [
     "init_ingestion_clients",
     "fetch_repo_docs",
     "fetch_repo_issues",
+    "iter_repo_issue_batches",
+    "iter_repo_issue_batches_async",
     "fetch_repo_code",
     "fetch_repo_pr_history",
+    "fetch_repo_pr_history_async",
     "chunk_and_embed_and_store",
+    "chunk_and_embed_and_store_stream",
     # patch
     "initialize_chroma_clients",
     "generate_patch_for_issue",
+    "generate_patches_for_issues",
+    # embeddings
+    "get_embeddings",
+    # ratelimit
+    "GitHubRateLimiter",
+    "get_github_rate_limiter",
     # server
     "mcp",
 ] 
\ No newline at end of file
@@ -4,15 +4,15 @@ import re
 import json
 import argparse
 import logging
+import functools
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-from github import Github
 # --- LangChain Imports ---
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_chroma import Chroma
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools.retriever import create_retriever_tool
@@ -24,10 +24,9 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 
-# --- Patch Generator Import ---
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
+from .embeddings import get_embeddings, get_collection_metadata
+from .vectorstore import get_chroma_client, collection_prefix
+from .ingest import get_repo_cached
 
 # --- Configuration ---
 load_dotenv()
@@ -65,24 +64,44 @@ SCOPES = ["https://www.googleapis.com/auth/documents"]
 
 # --- Helper Functions ---
 
+# Compiled once; every analysis request starts by parsing its issue URL
+_ISSUE_URL_RE = re.compile(r"github\.com/([^/]+)/([^/]+)/issues/(\d+)")
+
+@functools.lru_cache(maxsize=1024)
+def _parse_github_url_cached(url: str):
+    # Returns None for invalid URLs so the error is raised outside the cache
+    match = _ISSUE_URL_RE.search(url)
+    if not match:
+        return None
+    return match.group(1), match.group(2), int(match.group(3))
+
 def parse_github_url(url: str):
     """Parses a GitHub issue URL to get owner, repo, and issue number."""
-    match = re.search(r"github\.com/([^/]+)/([^/]+)/issues/(\d+)", url)
-    if not match:
+    parsed = _parse_github_url_cached(url)
+    if parsed is None:
         raise ValueError("Invalid GitHub issue URL format. Expected: https://github.com/owner/repo/issues/number")
-    return match.group(1), match.group(2), int(match.group(3))
+    return parsed
 
 def get_github_issue(owner: str, repo_name: str, issue_number: int):
     """Fetches issue data from GitHub."""
     logger.info(f"Fetching issue '{owner}/{repo_name}#{issue_number}' from GitHub...")
     try:
-        g = Github(GITHUB_TOKEN)
-        repo = g.get_repo(f"{owner}/{repo_name}")
+        repo = get_repo_cached(f"{owner}/{repo_name}")
         issue = repo.get_issue(number=issue_number)
         return issue
     except Exception as e:
         raise Exception(f"Failed to fetch GitHub issue: {e}")
 
+def get_issue_repo_name(issue) -> str:
+    """
+    Return "owner/repo" for an issue without another API call.
+
+    `issue.repository` is a lazy object whose `full_name` costs a GET of the
+    repository; the issue payload already carries its `repository_url`.
+    """
+    repository_url = issue.raw_data.get("repository_url", "")
+    return "/".join(repository_url.rstrip("/").split("/")[-2:])
+
 def initialize_chroma_retriever(repo_name: str = None):
     """Initializes the Chroma vector store and retriever tool with repository-specific collection."""
     logger.info("Initializing Chroma vector store and retriever...")
@@ -94,15 +113,12 @@ def initialize_chroma_retriever(repo_name: str = None):
                 f"Please run the ingestion script first."
             )
         
-        # Initialize embeddings
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001", 
-            google_api_key=GOOGLE_API_KEY
-        )
+        # Initialize embeddings (must match the model used at ingestion time)
+        embeddings = get_embeddings()
         
         # Create repository-specific collection name for issues
         if repo_name:
-            safe_repo_name = repo_name.replace('/', '_').replace('-', '_').lower()
+            safe_repo_name = collection_prefix(repo_name)
             collection_name = f"{safe_repo_name}_{COLLECTION_ISSUES}"
         else:
             collection_name = COLLECTION_ISSUES
@@ -110,8 +126,9 @@ def initialize_chroma_retriever(repo_name: str = None):
         logger.info(f"Loading Chroma collection: {collection_name}")
         chroma_store = Chroma(
             embedding_function=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR,
-            collection_name=collection_name
+            client=get_chroma_client(CHROMA_PERSIST_DIR),
+            collection_name=collection_name,
+            collection_metadata=get_collection_metadata()
         )
         
         # Create retriever
@@ -129,42 +146,8 @@ def initialize_chroma_retriever(repo_name: str = None):
     except Exception as e:
         raise Exception(f"Failed to initialize Chroma retriever: {e}")
 
-def create_langchain_agent(issue):
-    """
-    Analyzes a GitHub issue using a direct RAG chain, which is more reliable than a ReAct agent.
-    """
-    logger.info("Initializing LangChain RAG Chain...")
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash", 
-            temperature=0.2, 
-            google_api_key=GOOGLE_API_KEY,
-            max_retries=2,
-            request_timeout=45
-        )
-        
-        repo_name = issue.repository.full_name
-        # Build a retriever directly for this repository's issues collection
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=GOOGLE_API_KEY,
-        )
-        safe_repo_name = repo_name.replace('/', '_').replace('-', '_').lower()
-        collection_name = f"{safe_repo_name}_{COLLECTION_ISSUES}"
-        chroma_store = Chroma(
-            embedding_function=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR,
-            collection_name=collection_name,
-        )
-        retriever = chroma_store.as_retriever(search_kwargs={"k": 5})
-        
-        # Retrieve context up-front to keep the chain deterministic and quiet
-        query = f"Title: {issue.title}\nBody: {issue.body or 'No body.'}"
-        docs = retriever.get_relevant_documents(query)
-        context_text = "\n\n".join(doc.page_content for doc in docs)
-        
-        # Prompt instructs the model to return a strict JSON object
-        template = """
+# Prompt instructs the model to return a strict JSON object
+ANALYSIS_PROMPT_TEMPLATE = """
         You are an expert AI software engineer analyzing a GitHub issue for the '{repo_full_name}' repository.
         Use the following retrieved context from past issues and documentation to provide a detailed analysis.
 
@@ -185,12 +168,53 @@ def create_langchain_agent(issue):
 
         **Final Answer (JSON object):**
         """
-        prompt = ChatPromptTemplate.from_template(template)
 
-        # Create a more reliable RAG chain using LCEL
-        from langchain_core.output_parsers import StrOutputParser
+@functools.lru_cache(maxsize=1)
+def _get_analysis_chain():
+    """
+    Build the prompt | LLM | parser chain used for issue analysis.
 
-        rag_chain = prompt | llm | StrOutputParser()
+    Built once per process so every analysis reuses the same Gemini client
+    and its HTTP connections.
+    """
+    from langchain_core.output_parsers import StrOutputParser
+
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash", 
+        temperature=0.2, 
+        google_api_key=GOOGLE_API_KEY,
+        max_retries=2,
+        request_timeout=45
+    )
+    prompt = ChatPromptTemplate.from_template(ANALYSIS_PROMPT_TEMPLATE)
+    return prompt | llm | StrOutputParser()
+
+def create_langchain_agent(issue):
+    """
+    Analyzes a GitHub issue using a direct RAG chain, which is more reliable than a ReAct agent.
+    """
+    logger.info("Initializing LangChain RAG Chain...")
+    try:
+        repo_name = get_issue_repo_name(issue)
+        # Build a retriever directly for this repository's issues collection
+        embeddings = get_embeddings()
+        safe_repo_name = collection_prefix(repo_name)
+        collection_name = f"{safe_repo_name}_{COLLECTION_ISSUES}"
+        chroma_store = Chroma(
+            embedding_function=embeddings,
+            client=get_chroma_client(CHROMA_PERSIST_DIR),
+            collection_name=collection_name,
+            collection_metadata=get_collection_metadata(),
+        )
+        retriever = chroma_store.as_retriever(search_kwargs={"k": 5})
+        
+        # Retrieve context up-front to keep the chain deterministic and quiet
+        query = f"Title: {issue.title}\nBody: {issue.body or 'No body.'}"
+        docs = retriever.get_relevant_documents(query)
+        context_text = "\n\n".join(doc.page_content for doc in docs)
+        
+        # Create a more reliable RAG chain using LCEL
+        rag_chain = _get_analysis_chain()
 
         logger.info("Running RAG chain to analyze issue...")
         
@@ -238,7 +262,7 @@ def create_fallback_analysis(issue):
     complexity = min(5, max(1, complexity))
     
     # Extract key information from issue
-    summary = f"Issue in {issue.repository.full_name}: {issue.title}"
+    summary = f"Issue in {get_issue_repo_name(issue)}: {issue.title}"
     
     # Basic solution template based on common patterns
     if "streaming" in combined_text and "tool" in combined_text:
@@ -287,7 +311,7 @@ def create_fallback_analysis(issue):
     
     # Try to get some context from the knowledge base without LLM
     try:
-        repo_name = issue.repository.full_name
+        repo_name = get_issue_repo_name(issue)
         retriever_tool = initialize_chroma_retriever(repo_name)
         search_results = retriever_tool.invoke({"query": f"{title} {body[:100]}"})
         if search_results and len(search_results) > 50:
@@ -307,6 +331,12 @@ def create_fallback_analysis(issue):
     # Return as dictionary object, not JSON string
     return fallback_json
 
+# Patterns tried in order by parse_agent_output, compiled once at import
+_JSON_FENCE_RE = re.compile(r"```json\s*\n([\s\S]*?)\n\s*```")
+_CODE_FENCE_RE = re.compile(r"```\s*\n([\s\S]*?)\n\s*```")
+_JSON_OBJECT_RE = re.compile(r"(\{[\s\S]*\})")
+_FINAL_ANSWER_RE = re.compile(r"Final Answer:\s*([\s\S]*?)(?:\n\n|$)")
+
 def parse_agent_output(raw_output: str):
     """Extracts and parses the JSON from the agent's raw output string."""
     logger.info("Parsing agent's JSON output...")
@@ -335,28 +365,28 @@ def parse_agent_output(raw_output: str):
             }
         
         # Try to find JSON block within ```json ... ```
-        json_match = re.search(r"```json\s*\n([\s\S]*?)\n\s*```", raw_output)
+        json_match = _JSON_FENCE_RE.search(raw_output)
         if json_match:
             json_str = json_match.group(1).strip()
             logger.info(f"Found JSON block: {json_str[:100]}...")
             return json.loads(json_str)
         
         # Try to find JSON block within ``` ... ```
-        json_match = re.search(r"```\s*\n([\s\S]*?)\n\s*```", raw_output)
+        json_match = _CODE_FENCE_RE.search(raw_output)
         if json_match:
             json_str = json_match.group(1).strip()
             logger.info(f"Found code block: {json_str[:100]}...")
             return json.loads(json_str)
         
         # Try to find JSON object directly (look for { ... })
-        json_match = re.search(r"(\{[\s\S]*\})", raw_output)
+        json_match = _JSON_OBJECT_RE.search(raw_output)
         if json_match:
             json_str = json_match.group(1)
             logger.info(f"Found JSON object: {json_str[:100]}...")
             return json.loads(json_str)
         
         # Extract from "Final Answer:" section
-        final_answer_match = re.search(r"Final Answer:\s*([\s\S]*?)(?:\n\n|$)", raw_output)
+        final_answer_match = _FINAL_ANSWER_RE.search(raw_output)
         if final_answer_match:
             answer_text = final_answer_match.group(1).strip()
             logger.info(f"Found Final Answer: {answer_text[:100]}...")
@@ -403,7 +433,7 @@ def generate_patches_for_issue(issue, analysis):
         # Generate patches only (PR creation is now handled by the official GitHub server)
         result = generate_patch_for_issue(
             issue_body=issue_body,
-            repo_full_name=issue.repository.full_name
+            repo_full_name=get_issue_repo_name(issue)
         )
         
         return result
@@ -0,0 +1,237 @@
+"""
+Embedding providers shared by ingestion, analysis and patch generation.
+
+Stored vectors and query vectors must come from the same model, so every
+module obtains its embeddings through get_embeddings(). The provider is
+selected with the EMBEDDING_PROVIDER environment variable:
+
+- "google" (default): Gemini embedding API
+- "fastembed": local sentence-transformers model run by FastEmbed on
+  ONNX Runtime, using CUDA when a GPU is available
+- "auto": "fastembed" when ONNX Runtime reports a CUDA device, else "google"
+"""
+
+import os
+import array
+import functools
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Gemini model details. The 'embedding-001' model outputs 768-dimensional vectors.
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+
+# Local (FastEmbed/ONNX) model details
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "256"))
+# Data-parallel CPU workers for large batches (0 = one per core)
+LOCAL_EMBEDDING_PARALLEL = int(os.getenv("LOCAL_EMBEDDING_PARALLEL", "0"))
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "google").lower()
+
+# Collection metadata key recording which model produced the stored vectors
+EMBEDDING_MODEL_METADATA_KEY = "embedding_model"
+
+# Content-addressed cache of document vectors, shared by every collection
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "true").lower() in ("1", "true", "yes")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH") or os.path.join(
+    os.getenv("CHROMA_PERSIST_DIR") or os.path.join(PROJECT_ROOT, "chroma_db"), "embedding_cache.sqlite3"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _cuda_available() -> bool:
+    """Return True if ONNX Runtime can run on a CUDA device."""
+    try:
+        import onnxruntime
+    except ImportError:
+        return False
+    return "CUDAExecutionProvider" in onnxruntime.get_available_providers()
+
+
+class LocalOnnxEmbeddings(Embeddings):
+    """LangChain embeddings backed by a FastEmbed (ONNX Runtime) model."""
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+                 parallel: int = LOCAL_EMBEDDING_PARALLEL):
+        try:
+            from fastembed import TextEmbedding
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_PROVIDER=fastembed needs the optional local embedding dependencies: "
+                "pip install -r requirements-local-embeddings.txt"
+            ) from e
+
+        if _cuda_available():
+            providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+            # A single session keeps the GPU busy; extra workers would each claim it
+            parallel = None
+        else:
+            providers = ["CPUExecutionProvider"]
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self._model = TextEmbedding(model_name=model_name, providers=providers)
+        logger.info("✅ Loaded local embedding model %s (%s)", model_name, providers[0])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # FastEmbed only fans out to worker processes when texts exceed one batch
+        vectors = self._model.embed(texts, batch_size=self.batch_size, parallel=self.parallel)
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return next(iter(self._model.query_embed(text))).tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrap an embeddings client with a SQLite cache keyed by SHA-256 of the text.
+
+    Embedding is deterministic for a fixed model, so unchanged chunks (and
+    snippets duplicated across collections) are read back instead of being
+    sent to the model again. Entries are namespaced by model name. Queries
+    are not cached.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, path: str = EMBEDDING_CACHE_PATH):
+        self.underlying = underlying
+        self.model_name = model_name
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Embedding runs in worker threads; a lock serializes access to the connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets readers proceed during writes; NORMAL sync is safe under WAL and
+        # skips an fsync per commit. A lost tail only costs a re-embed.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb_cache ("
+            "model TEXT NOT NULL, k BLOB NOT NULL, vec BLOB NOT NULL, PRIMARY KEY (model, k))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Expose attributes of the wrapped client (e.g. batch_size)
+        if name == "underlying":
+            raise AttributeError(name)
+        return getattr(self.underlying, name)
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        found = {}
+        # Stay under SQLite's default host-parameter limit
+        for start in range(0, len(keys), 900):
+            chunk = keys[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT k, vec FROM emb_cache WHERE model = ? AND k IN ({placeholders})",
+                [self.model_name, *chunk]
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array.array("f", blob).tolist()
+        return found
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        with self._lock:
+            cached = self._lookup(list(set(keys)))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_entries = dict(zip(missing, vectors))
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO emb_cache (model, k, vec) VALUES (?, ?, ?)",
+                    [(self.model_name, key, array.array("f", vector).tobytes())
+                     for key, vector in new_entries.items()]
+                )
+                self._conn.commit()
+            cached.update(new_entries)
+        logger.debug("Embedding cache: %d hits, %d misses", len(texts) - len(missing), len(missing))
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+
+@functools.lru_cache(maxsize=None)
+def get_embedding_provider() -> str:
+    """
+    Resolve the configured provider ('auto' picks fastembed on CUDA hosts).
+
+    Resolved once per process; every collection open asks for it.
+    """
+    if EMBEDDING_PROVIDER == "auto":
+        return "fastembed" if _cuda_available() else "google"
+    return EMBEDDING_PROVIDER
+
+
+def get_embedding_model_name() -> str:
+    """Name of the model whose vectors are written to and read from Chroma."""
+    if get_embedding_provider() == "fastembed":
+        return LOCAL_EMBEDDING_MODEL
+    return GEMINI_EMBEDDING_MODEL
+
+
+def get_collection_metadata() -> Dict[str, str]:
+    """Metadata attached to new Chroma collections."""
+    return {EMBEDDING_MODEL_METADATA_KEY: get_embedding_model_name()}
+
+
+def verify_collection_model(chroma_store) -> None:
+    """
+    Raise if a collection was populated by a different embedding model.
+
+    Collections created before the model was recorded are assumed to hold
+    Gemini vectors.
+    """
+    collection = chroma_store._collection
+    stored_model = (collection.metadata or {}).get(EMBEDDING_MODEL_METADATA_KEY, GEMINI_EMBEDDING_MODEL)
+    active_model = get_embedding_model_name()
+    if stored_model != active_model:
+        raise ValueError(
+            f"Collection '{collection.name}' was embedded with '{stored_model}' but the active "
+            f"embedding model is '{active_model}'. Clear and re-ingest the repository, or set "
+            f"EMBEDDING_PROVIDER to match the stored vectors."
+        )
+
+
+def _create_provider_embeddings() -> Embeddings:
+    if get_embedding_provider() == "fastembed":
+        return LocalOnnxEmbeddings()
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(
+        model=GEMINI_EMBEDDING_MODEL,
+        google_api_key=os.getenv("GOOGLE_API_KEY")
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_embeddings() -> Embeddings:
+    """
+    Return the embeddings client for the configured provider.
+
+    Created once per process: every caller shares one client, one loaded local
+    model and one SQLite cache connection.
+    """
+    embeddings = _create_provider_embeddings()
+    if not EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    try:
+        return CachedEmbeddings(embeddings, get_embedding_model_name())
+    except sqlite3.Error as e:
+        logger.warning("⚠️ Embedding cache unavailable, embedding without it: %s", e)
+        return embeddings
@@ -5,12 +5,17 @@ import time
 import argparse
 import subprocess
 import shutil
+import tempfile
 import ast
 import re
 import logging
 import sys
 import asyncio
-from typing import List, Dict, Any
+import functools
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable
 
 from dotenv import load_dotenv
 
@@ -21,22 +26,33 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stderr)]
 )
 logger = logging.getLogger(__name__)
-from github import Github, RateLimitExceededException
+from github import Auth, Github, RateLimitExceededException
 from langchain_chroma import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 import google.generativeai as genai
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from tqdm import tqdm
 
+from .ratelimit import get_github_rate_limiter
+from .vectorstore import get_chroma_client, collection_prefix
+from .github_graphql import iter_issue_pages
+from .embeddings import (
+    get_embeddings,
+    get_collection_metadata,
+    verify_collection_model
+)
+
+# Rust-backed splitter is much faster than the pure-Python recursive splitter;
+# fall back to LangChain's splitter when it is not installed.
+try:
+    from semantic_text_splitter import TextSplitter as RustTextSplitter
+except ImportError:
+    RustTextSplitter = None
+
 # --- CONFIGURATION ---
 # Load environment variables from .env file
 load_dotenv()
 
-# Gemini model details. The 'embedding-001' is a powerful free model.
-# Its output vectors have 768 dimensions.
-GEMINI_EMBEDDING_MODEL = "models/embedding-001"
-
 # Chroma configuration
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", os.path.abspath(os.path.join(PROJECT_ROOT, "chroma_db")))
@@ -47,6 +63,31 @@ COLLECTION_DOCS = "documentation"
 COLLECTION_PR_HISTORY = "pr_history"
 COLLECTION_REPO_CODE = "repo_code_main"
 
+def _python_top_level_spans(tree: ast.Module) -> List[tuple]:
+    """Return (name, type, start_line, end_line) for top-level functions and classes.
+    
+    Boundaries come straight from the AST, so decorators are included and
+    methods stay inside their class instead of becoming separate chunks.
+    """
+    spans = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start_line = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            item_type = "class" if isinstance(node, ast.ClassDef) else "function"
+            spans.append((node.name, item_type, start_line, node.end_lineno))
+    return spans
+
+def _snap_to_boundaries(section_starts: List[int], boundaries: List[int]) -> List[int]:
+    """Move section start offsets (0-based) onto the nearest definition boundary."""
+    if not boundaries:
+        return section_starts
+    snapped = [section_starts[0]]
+    for start in section_starts[1:]:
+        nearest = min(boundaries, key=lambda b: abs(b - start))
+        if nearest > snapped[-1]:
+            snapped.append(nearest)
+    return snapped
+
 def extract_functions_from_code(file_content: str, file_path: str) -> List[Dict[str, Any]]:
     """Optimized function extraction with smarter chunking for better performance."""
     functions = []
@@ -71,34 +112,22 @@ def extract_functions_from_code(file_content: str, file_path: str) -> List[Dict[
         # STRATEGY 2: Medium files - extract major functions/classes only
         if file_ext in ['.py'] and file_size <= 10000:
             tree = ast.parse(file_content)
+            lines = file_content.split('\n')
             major_items = []
             
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                    start_line = node.lineno
-                    lines = file_content.split('\n')
-                    
-                    # Smart end detection with size limits
-                    end_line = min(len(lines), start_line + 50)  # Limit function size
-                    base_indent = len(lines[start_line - 1]) - len(lines[start_line - 1].lstrip())
-                    
-                    for i in range(start_line, min(len(lines), start_line + 50)):
-                        line = lines[i]
-                        if line.strip() and len(line) - len(line.lstrip()) <= base_indent and i > start_line:
-                            end_line = i
-                            break
-                    
-                    func_code = '\n'.join(lines[start_line-1:end_line])
-                    
-                    # Only include substantial functions to reduce noise
-                    if len(func_code) > 100:  # Skip tiny functions
-                        major_items.append({
-                            "name": node.name,
-                            "type": "class" if isinstance(node, ast.ClassDef) else "function",
-                            "code": func_code,
-                            "start_line": start_line,
-                            "end_line": end_line
-                        })
+            # Chunk at exact top-level function/class boundaries from the AST
+            for name, item_type, start_line, end_line in _python_top_level_spans(tree):
+                func_code = '\n'.join(lines[start_line-1:end_line])
+                
+                # Only include substantial functions to reduce noise
+                if len(func_code) > 100:  # Skip tiny functions
+                    major_items.append({
+                        "name": name,
+                        "type": item_type,
+                        "code": func_code,
+                        "start_line": start_line,
+                        "end_line": end_line
+                    })
             
             # If we found substantial functions, use them; otherwise use whole file
             if major_items and len(major_items) <= 5:  # Don't create too many chunks
@@ -119,10 +148,17 @@ def extract_functions_from_code(file_content: str, file_path: str) -> List[Dict[
             lines = file_content.split('\n')
             total_lines = len(lines)
             section_size = total_lines // 3  # Create 3 sections max
+            section_starts = list(range(0, total_lines, section_size))[:3]
+            
+            # Python: start sections on top-level definitions so no function
+            # or class is split across two chunks
+            if file_ext == '.py':
+                boundaries = [span[2] - 1 for span in _python_top_level_spans(ast.parse(file_content))]
+                section_starts = _snap_to_boundaries(section_starts, boundaries)
             
             sections = []
-            for i in range(0, total_lines, section_size):
-                end_idx = min(i + section_size, total_lines)
+            for idx, i in enumerate(section_starts):
+                end_idx = section_starts[idx + 1] if idx + 1 < len(section_starts) else total_lines
                 section_code = '\n'.join(lines[i:end_idx])
                 
                 sections.append({
@@ -132,9 +168,6 @@ def extract_functions_from_code(file_content: str, file_path: str) -> List[Dict[
                     "start_line": i + 1,
                     "end_line": end_idx
                 })
-                
-                if len(sections) >= 3:  # Max 3 sections per file
-                    break
             
             functions.extend(sections)
         
@@ -192,17 +225,27 @@ def extract_functions_from_code(file_content: str, file_path: str) -> List[Dict[
     
     return functions
 
+# File selection for code ingestion, built once instead of per walked file
+_PRIORITY_CODE_EXTENSIONS = frozenset({'.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.go', '.rs'})
+_SECONDARY_CODE_EXTENSIONS = frozenset({'.cpp', '.c', '.h', '.cs', '.php', '.rb', '.swift'})
+_SKIPPED_CODE_DIRS = frozenset({
+    'node_modules', '.git', 'dist', 'build', 'coverage',
+    '__pycache__', '.pytest_cache', 'venv', 'env'
+})
+_SKIPPED_DOC_DIRS = frozenset({
+    'node_modules', '.git', 'dist', 'build', '_build',
+    '.next', '.nuxt', 'coverage', '__pycache__'
+})
+
 async def fetch_repo_code(repo_full_name: str):
     """
     Optimized repository code extraction with performance improvements and chunk reduction.
     Prioritizes important files and reduces total chunk count significantly.
     """
-    import time
-    start_time = time.time()
+    start_time = time.perf_counter()
     logger.info("🚀 OPTIMIZED code extraction starting...")
     
     # Use system temp directory to avoid permission issues
-    import tempfile
     temp_base_dir = tempfile.mkdtemp(prefix=f"mcp_clone_{repo_full_name.replace('/', '_')}_")
     temp_dir = os.path.join(temp_base_dir, "repo")
     
@@ -226,7 +269,9 @@ async def fetch_repo_code(repo_full_name: str):
         )
         logger.info("✅ Repository cloned successfully.")
     except subprocess.CalledProcessError as e:
-        logger.warning(f"Failed to clone repository: {e.stderr}")
+        # git may echo the remote URL, which carries the token
+        stderr = e.stderr.replace(github_token, "***") if github_token and e.stderr else e.stderr
+        logger.warning(f"Failed to clone repository: {stderr}")
         # Attempt to clone without token for public repos if the above failed
         try:
             clone_url = f"https://github.com/{repo_full_name}.git"
@@ -246,22 +291,25 @@ async def fetch_repo_code(repo_full_name: str):
     code_chunks = []
     
     # OPTIMIZED: Priority-based file selection to reduce noise
-    priority_extensions = ['.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.go', '.rs']
-    secondary_extensions = ['.cpp', '.c', '.h', '.cs', '.php', '.rb', '.swift']
-    
     # Collect files with priority system
     priority_files = []
     secondary_files = []
     
-    for root, _, files in os.walk(temp_dir):
-        # Skip common non-essential directories to reduce processing
-        if any(skip_dir in root for skip_dir in [
-            'node_modules', '.git', 'dist', 'build', 'coverage', 
-            '__pycache__', '.pytest_cache', 'venv', 'env'
-        ]):
-            continue
+    for root, dirs, files in os.walk(temp_dir):
+        # Skip common non-essential directories to reduce processing; pruning
+        # them here stops os.walk from descending into them at all
+        dirs[:] = [d for d in dirs if d not in _SKIPPED_CODE_DIRS]
             
         for file in files:
+            # One set lookup per file; files of other types are not even stat'ed
+            ext = os.path.splitext(file)[1]
+            if ext in _PRIORITY_CODE_EXTENSIONS:
+                target = priority_files
+            elif ext in _SECONDARY_CODE_EXTENSIONS:
+                target = secondary_files
+            else:
+                continue
+            
             file_path = os.path.join(root, file)
             file_size = os.path.getsize(file_path)
             
@@ -270,10 +318,7 @@ async def fetch_repo_code(repo_full_name: str):
                 logger.warning(f"Skipping large file: {file} ({file_size} bytes)")
                 continue
                 
-            if any(file.endswith(ext) for ext in priority_extensions):
-                priority_files.append(file_path)
-            elif any(file.endswith(ext) for ext in secondary_extensions):
-                secondary_files.append(file_path)
+            target.append(file_path)
     
     # Limit total files to process (prevent excessive processing)
     max_priority_files = 250  # Process up to 150 priority files
@@ -290,7 +335,7 @@ async def fetch_repo_code(repo_full_name: str):
     
     try:
         for i in range(0, len(files_to_process), batch_size):
-            batch_start = time.time()
+            batch_start = time.perf_counter()
             batch = files_to_process[i:i+batch_size]
             
             for file_path in batch:
@@ -329,7 +374,7 @@ async def fetch_repo_code(repo_full_name: str):
                     processed_count += 1
             
             # Enhanced progress logging
-            batch_time = time.time() - batch_start
+            batch_time = time.perf_counter() - batch_start
             logger.info(f"📦 Processed batch {i//batch_size + 1}: {len(batch)} files → {processed_count} total (⏱️ {batch_time:.1f}s)")
             
             # Smart yielding based on time
@@ -341,11 +386,13 @@ async def fetch_repo_code(repo_full_name: str):
     except Exception as e:
         logger.error(f"Error during code processing: {e}")
     finally:
-        # Clean up the temporary directory
+        # Clean up the temporary directory. A clone holds thousands of files, so
+        # delete it in a worker thread rather than stalling the event loop;
+        # shutil.rmtree already walks with os.scandir on POSIX
         if os.path.exists(temp_base_dir):
-            shutil.rmtree(temp_base_dir)
+            await asyncio.to_thread(shutil.rmtree, temp_base_dir, ignore_errors=True)
     
-    total_time = time.time() - start_time
+    total_time = time.perf_counter() - start_time
     efficiency_ratio = processed_count / len(code_chunks) if code_chunks else 0
     
     logger.info(f"🎉 CODE EXTRACTION COMPLETE:")
@@ -360,12 +407,10 @@ async def fetch_repo_docs(repo_full_name: str):
     Optimized documentation extraction with intelligent prioritization and chunk reduction.
     Focuses on the most important documentation while maintaining quality.
     """
-    import time
-    start_time = time.time()
+    start_time = time.perf_counter()
     logger.info("🚀 OPTIMIZED documentation extraction starting...")
     
     # Use system temp directory to avoid permission issues
-    import tempfile
     temp_base_dir = tempfile.mkdtemp(prefix=f"mcp_docs_{repo_full_name.replace('/', '_')}_")
     temp_dir = os.path.join(temp_base_dir, "repo")
     
@@ -389,7 +434,9 @@ async def fetch_repo_docs(repo_full_name: str):
         )
         logger.info("✅ Repository cloned successfully.")
     except subprocess.CalledProcessError as e:
-        logger.warning(f"Failed to clone repository: {e.stderr}")
+        # git may echo the remote URL, which carries the token
+        stderr = e.stderr.replace(github_token, "***") if github_token and e.stderr else e.stderr
+        logger.warning(f"Failed to clone repository: {stderr}")
         # Attempt to clone without token for public repos if the above failed
         try:
             clone_url = f"https://github.com/{repo_full_name}.git"
@@ -414,13 +461,9 @@ async def fetch_repo_docs(repo_full_name: str):
     regular_docs = []     # Other markdown files
     
     # Collect documentation files with intelligent prioritization
-    for root, _, files in os.walk(temp_dir):
-        # Skip generated/build directories for docs
-        if any(skip_dir in root.lower() for skip_dir in [
-            'node_modules', '.git', 'dist', 'build', '_build', 
-            '.next', '.nuxt', 'coverage', '__pycache__'
-        ]):
-            continue
+    for root, dirs, files in os.walk(temp_dir):
+        # Skip generated/build directories for docs (pruned, so never walked)
+        dirs[:] = [d for d in dirs if d.lower() not in _SKIPPED_DOC_DIRS]
             
         for file in files:
             if file.endswith((".md", ".txt", "README")):
@@ -470,7 +513,7 @@ async def fetch_repo_docs(repo_full_name: str):
     
     try:
         for i in range(0, len(docs_to_process), batch_size):
-            batch_start = time.time()
+            batch_start = time.perf_counter()
             batch = docs_to_process[i:i+batch_size]
             
             for file_path in batch:
@@ -503,7 +546,7 @@ async def fetch_repo_docs(repo_full_name: str):
                     processed_count += 1
             
             # Enhanced progress logging
-            batch_time = time.time() - batch_start
+            batch_time = time.perf_counter() - batch_start
             logger.info(f"📦 Processed batch {i//batch_size + 1}: {len(batch)} docs → {processed_count} total (⏱️ {batch_time:.1f}s)")
             
             # Smart yielding based on time
@@ -515,11 +558,13 @@ async def fetch_repo_docs(repo_full_name: str):
     except Exception as e:
         logger.error(f"Error during documentation processing: {e}")
     finally:
-        # Clean up the temporary directory
+        # Clean up the temporary directory. A clone holds thousands of files, so
+        # delete it in a worker thread rather than stalling the event loop;
+        # shutil.rmtree already walks with os.scandir on POSIX
         if os.path.exists(temp_base_dir):
-            shutil.rmtree(temp_base_dir)
+            await asyncio.to_thread(shutil.rmtree, temp_base_dir, ignore_errors=True)
     
-    total_time = time.time() - start_time
+    total_time = time.perf_counter() - start_time
     
     logger.info(f"🎉 DOCUMENTATION EXTRACTION COMPLETE:")
     logger.info(f"  📄 {processed_count} files processed → 📦 {len(docs)} documentation chunks")
@@ -528,6 +573,60 @@ async def fetch_repo_docs(repo_full_name: str):
     
     return docs
 
+def _build_pr_document(pr) -> Dict[str, Any]:
+    """Fetch a merged PR's changed files and build its ingestion document."""
+    # OPTIMIZATION: Limit file processing to avoid huge PRs
+    files = list(pr.get_files())
+    max_files_to_process = 10  # Only process first 10 files for efficiency
+    files_to_process = files[:max_files_to_process]
+
+    # Start with PR metadata
+    pr_description = pr.body or "No description"
+    if len(pr_description) > 1500:
+        pr_description = pr_description[:1500] + "...[truncated]"
+
+    pr_content = f"Title: {pr.title}\nDescription: {pr_description}\n"
+
+    # Add file changes with size limits
+    diff_content = ""
+    total_diff_size = 0
+    max_total_diff_size = 8000  # Limit total diff content
+
+    for file in files_to_process:
+        if file.patch and total_diff_size < max_total_diff_size:
+            # Limit individual file patch size
+            file_patch = file.patch
+            if len(file_patch) > 2000:
+                file_patch = file_patch[:2000] + "\n...[diff truncated]"
+
+            file_diff = f"\nFile: {file.filename}\nStatus: {file.status}\nDiff:\n{file_patch}\n"
+
+            # Check if adding this diff would exceed our limit
+            if total_diff_size + len(file_diff) > max_total_diff_size:
+                diff_content += f"\n[Additional files truncated for size...]"
+                break
+
+            diff_content += file_diff
+            total_diff_size += len(file_diff)
+
+    pr_content += diff_content
+
+    # Add summary if we truncated files
+    if len(files) > max_files_to_process:
+        pr_content += f"\n[Note: Processed {max_files_to_process} of {len(files)} files]"
+
+    return {
+        "source": f"PR #{pr.number}",
+        "content": pr_content,
+        "type": "pr",
+        "pr_number": pr.number,
+        "pr_title": pr.title,
+        "pr_url": pr.html_url,
+        "merged_at": pr.merged_at.isoformat() if pr.merged_at else None,
+        "files_count": len(files),
+        "files_processed": len(files_to_process)
+    }
+
 def fetch_repo_pr_history(repo, max_prs=50):
     """Optimized PR history fetching with smart content filtering and diff size limits."""
     logger.info(f"🚀 OPTIMIZED PR history fetching (max: {max_prs})...")
@@ -543,59 +642,10 @@ def fetch_repo_pr_history(repo, max_prs=50):
                 logger.info(f"✅ Reached maximum PR limit ({max_prs}), stopping...")
                 break
                 
-            if pr.merged:
+            # merged_at is part of the list payload; pr.merged would cost a request per PR
+            if pr.merged_at is not None:
                 try:
-                    # OPTIMIZATION: Limit file processing to avoid huge PRs
-                    files = list(pr.get_files())
-                    max_files_to_process = 10  # Only process first 10 files for efficiency
-                    files_to_process = files[:max_files_to_process]
-                    
-                    # Start with PR metadata
-                    pr_description = pr.body or "No description"
-                    if len(pr_description) > 1500:
-                        pr_description = pr_description[:1500] + "...[truncated]"
-                    
-                    pr_content = f"Title: {pr.title}\nDescription: {pr_description}\n"
-                    
-                    # Add file changes with size limits
-                    diff_content = ""
-                    total_diff_size = 0
-                    max_total_diff_size = 8000  # Limit total diff content
-                    
-                    for file in files_to_process:
-                        if file.patch and total_diff_size < max_total_diff_size:
-                            # Limit individual file patch size
-                            file_patch = file.patch
-                            if len(file_patch) > 2000:
-                                file_patch = file_patch[:2000] + "\n...[diff truncated]"
-                            
-                            file_diff = f"\nFile: {file.filename}\nStatus: {file.status}\nDiff:\n{file_patch}\n"
-                            
-                            # Check if adding this diff would exceed our limit
-                            if total_diff_size + len(file_diff) > max_total_diff_size:
-                                diff_content += f"\n[Additional files truncated for size...]"
-                                break
-                                
-                            diff_content += file_diff
-                            total_diff_size += len(file_diff)
-                    
-                    pr_content += diff_content
-                    
-                    # Add summary if we truncated files
-                    if len(files) > max_files_to_process:
-                        pr_content += f"\n[Note: Processed {max_files_to_process} of {len(files)} files]"
-                    
-                    pr_data.append({
-                        "source": f"PR #{pr.number}",
-                        "content": pr_content,
-                        "type": "pr",
-                        "pr_number": pr.number,
-                        "pr_title": pr.title,
-                        "pr_url": pr.html_url,
-                        "merged_at": pr.merged_at.isoformat() if pr.merged_at else None,
-                        "files_count": len(files),
-                        "files_processed": len(files_to_process)
-                    })
+                    pr_data.append(_build_pr_document(pr))
                     count += 1
                     
                     # Progress feedback every 10 PRs
@@ -614,15 +664,109 @@ def fetch_repo_pr_history(repo, max_prs=50):
     return pr_data
 
 
+def _list_merged_prs(repo, max_prs: int) -> List[Any]:
+    """Collect up to max_prs recently updated merged PRs from the PR list pages."""
+    merged_prs = []
+    for pr in repo.get_pulls(state="closed", sort="updated", direction="desc"):
+        if pr.merged_at is not None:
+            merged_prs.append(pr)
+            if len(merged_prs) >= max_prs:
+                break
+    return merged_prs
+
+# Seconds to wait for per-PR file fetches before skipping the stragglers
+PR_FETCH_TIMEOUT = float(os.getenv("PR_FETCH_TIMEOUT", "240"))
+
+async def fetch_repo_pr_history_async(repo, max_prs=50):
+    """
+    Fetch merged PR history with the per-PR file requests running concurrently.
+    
+    The PR list is paged in a worker thread, then every PR's files are fetched
+    in parallel under the shared GitHub rate limiter. Once PR_FETCH_TIMEOUT
+    seconds have passed no new PR is started and the ones still waiting for
+    the limiter are skipped; builds already running finish inside their slot,
+    since their worker thread cannot be cancelled.
+    """
+    logger.info(f"🚀 Concurrent PR history fetching (max: {max_prs})...")
+    start_time = time.perf_counter()
+    
+    try:
+        prs = await asyncio.to_thread(_list_merged_prs, repo, max_prs)
+    except Exception as e:
+        logger.error(f"❌ Error fetching PR history: {e}")
+        return []
+    
+    limiter = get_github_rate_limiter()
+    deadline = time.monotonic() + PR_FETCH_TIMEOUT
+    started = set()
+    
+    async def build(pr):
+        async with limiter:
+            if time.monotonic() >= deadline:
+                return None
+            started.add(pr.number)
+            return await asyncio.to_thread(_build_pr_document, pr)
+    
+    tasks = [asyncio.create_task(build(pr)) for pr in prs]
+    if not tasks:
+        logger.info("✅ PR fetching complete: 0 merged PRs")
+        return []
+    
+    _, pending = await asyncio.wait(tasks, timeout=PR_FETCH_TIMEOUT)
+    # Only PRs still queued for the limiter are cancelled; running builds are awaited
+    for pr, task in zip(prs, tasks):
+        if task in pending and pr.number not in started:
+            task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    
+    # Keep the list order (most recently updated first)
+    pr_data = []
+    skipped = 0
+    for pr, task in zip(prs, tasks):
+        if task.cancelled():
+            skipped += 1
+        elif task.exception():
+            logger.warning(f"⚠️ Error fetching PR #{pr.number}: {task.exception()}")
+        elif task.result() is None:
+            skipped += 1
+        else:
+            pr_data.append(task.result())
+    if skipped:
+        logger.warning(f"⚠️ Skipped {skipped} PRs not started within {PR_FETCH_TIMEOUT:.0f}s")
+    
+    logger.info(f"✅ PR fetching complete: {len(pr_data)} merged PRs in {time.perf_counter() - start_time:.1f}s")
+    return pr_data
+
+
 # --- INITIALIZATION ---
+# Process-wide GitHub client, reused so its HTTP session and connections
+# survive across ingestion steps instead of being rebuilt on every call.
+_github_client = None
+
+# HTTP connections kept open by the shared client; sized for concurrent ingestion steps
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "20"))
+
+def get_github_client() -> Github:
+    """
+    Return the shared GitHub client, creating it on first use.
+    
+    One client (and its pooled HTTP session) serves ingestion, analysis and
+    the server tools. Listings fetch 100 items per page instead of 30.
+    """
+    global _github_client
+    if _github_client is None:
+        github_token = os.getenv("GITHUB_TOKEN")
+        if not github_token:
+            raise ValueError("GITHUB_TOKEN not found in .env file")
+        _github_client = Github(auth=Auth.Token(github_token), per_page=100, pool_size=GITHUB_POOL_SIZE)
+    return _github_client
+
 def initialize_clients():
     """Initializes and returns clients for all required services."""
     try:
         # GitHub
-        github_token = os.getenv("GITHUB_TOKEN")
-        if not github_token:
-            raise ValueError("GITHUB_TOKEN not found in .env file")
-        g = Github(github_token)
+        g = get_github_client()
 
         # Google AI (Gemini)
         google_api_key = os.getenv("GOOGLE_API_KEY")
@@ -630,32 +774,34 @@ def initialize_clients():
             raise ValueError("GOOGLE_API_KEY not found in .env file")
         genai.configure(api_key=google_api_key)
 
-        # Initialize embeddings
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model=GEMINI_EMBEDDING_MODEL, 
-            google_api_key=google_api_key
-        )
+        # Initialize embeddings for the configured provider (Gemini or local ONNX)
+        embeddings = get_embeddings()
 
         return g, embeddings
     except Exception as e:
         logger.error(f"Error during client initialization: {e}")
-        exit()
+        raise
+
+def _full_collection_name(collection_name: str, repo_name: str = None) -> str:
+    """Repository-specific collection name, e.g. 'owner_repo_repo_code'."""
+    if repo_name:
+        return f"{collection_prefix(repo_name)}_{collection_name}"
+    return collection_name
 
 def create_chroma_collection(embeddings, collection_name: str, repo_name: str = None):
     """Create or get a Chroma collection with repository-specific naming."""
-    if repo_name:
-        # Create repository-specific collection name
-        safe_repo_name = repo_name.replace('/', '_').replace('-', '_').lower()
-        full_collection_name = f"{safe_repo_name}_{collection_name}"
-    else:
-        full_collection_name = collection_name
+    full_collection_name = _full_collection_name(collection_name, repo_name)
     
     logger.info(f"Creating/connecting to Chroma collection: {full_collection_name}")
-    return Chroma(
+    chroma_store = Chroma(
         embedding_function=embeddings,
-        persist_directory=CHROMA_PERSIST_DIR,
-        collection_name=full_collection_name
+        client=get_chroma_client(CHROMA_PERSIST_DIR),
+        collection_name=full_collection_name,
+        collection_metadata=get_collection_metadata()
     )
+    # Never mix vectors from different embedding models in one collection
+    verify_collection_model(chroma_store)
+    return chroma_store
 
 # --- DATA FETCHING ---
 def fetch_repo_docs_api(repo):
@@ -678,6 +824,66 @@ def fetch_repo_docs_api(repo):
     logger.info(f"Found {len(docs)} documentation files.")
     return docs
 
+def _format_issue_document(number: int, title: str, state: str, body: str,
+                           comment_bodies: List[str], url: str, created_at: str) -> Dict[str, Any]:
+    """Build the ingestion document for one issue from its fields and comment bodies."""
+    # Build issue content with size limits
+    comments_text = ""
+    if comment_bodies:
+        comment_parts = []
+        for comment_body in comment_bodies:
+            if comment_body and len(comment_body.strip()) > 10:
+                # Limit comment length to prevent huge issues
+                comment_text = comment_body[:1000] + "..." if len(comment_body) > 1000 else comment_body
+                comment_parts.append(comment_text)
+
+            # Stop if we have enough comment content
+            if len("\n".join(comment_parts)) > 2000:
+                break
+
+        comments_text = "\n---\n".join(comment_parts)
+
+    # Limit issue body size
+    issue_body = body or ""
+    if len(issue_body) > 3000:
+        issue_body = issue_body[:3000] + "...[truncated]"
+
+    # Create concise but informative issue content
+    full_issue_text = f"Title: {title}\nState: {state}\nBody: {issue_body}"
+    if comments_text:
+        full_issue_text += f"\nComments:\n{comments_text}"
+
+    return {
+        "source": f"issue #{number}",
+        "content": full_issue_text,
+        "type": "issue",
+        "issue_number": number,
+        "issue_title": title,
+        "issue_url": url,
+        "created_at": created_at,
+        "state": state
+    }
+
+def _build_issue_document(issue) -> Dict[str, Any]:
+    """Build the ingestion document for a PyGithub issue (body plus first comments)."""
+    # OPTIMIZATION: Limit comment fetching to reduce API calls and processing time
+    max_comments = 5  # Only get first 5 comments for context
+    # islice stops the paginator after the first page instead of listing every comment
+    comments = list(itertools.islice(issue.get_comments(), max_comments))
+    return _format_issue_document(
+        issue.number, issue.title, issue.state, issue.body,
+        [comment.body for comment in comments], issue.html_url,
+        issue.created_at.isoformat() if issue.created_at else None
+    )
+
+def _graphql_issue_document(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the ingestion document for an issue node returned by GraphQL."""
+    return _format_issue_document(
+        node["number"], node["title"], node["state"].lower(), node.get("body"),
+        [comment["body"] for comment in node["comments"]["nodes"]], node["url"],
+        node.get("createdAt")
+    )
+
 def fetch_repo_issues(repo, max_issues=100):
     """Optimized issue fetching with smart content filtering and reduced processing time."""
     logger.info(f"🚀 OPTIMIZED issue fetching (max: {max_issues})...")
@@ -695,46 +901,7 @@ def fetch_repo_issues(repo, max_issues=100):
                 break
                 
             try:
-                # OPTIMIZATION: Limit comment fetching to reduce API calls and processing time
-                max_comments = 5  # Only get first 5 comments for context
-                comments = list(issue.get_comments())[:max_comments]
-                
-                # Build issue content with size limits
-                comments_text = ""
-                if comments:
-                    comment_parts = []
-                    for comment in comments:
-                        if comment.body and len(comment.body.strip()) > 10:
-                            # Limit comment length to prevent huge issues
-                            comment_text = comment.body[:1000] + "..." if len(comment.body) > 1000 else comment.body
-                            comment_parts.append(comment_text)
-                        
-                        # Stop if we have enough comment content
-                        if len("\n".join(comment_parts)) > 2000:
-                            break
-                    
-                    comments_text = "\n---\n".join(comment_parts)
-                
-                # Limit issue body size
-                issue_body = issue.body or ""
-                if len(issue_body) > 3000:
-                    issue_body = issue_body[:3000] + "...[truncated]"
-                
-                # Create concise but informative issue content
-                full_issue_text = f"Title: {issue.title}\nState: {issue.state}\nBody: {issue_body}"
-                if comments_text:
-                    full_issue_text += f"\nComments:\n{comments_text}"
-                
-                issues_data.append({
-                    "source": f"issue #{issue.number}",
-                    "content": full_issue_text,
-                    "type": "issue",
-                    "issue_number": issue.number,
-                    "issue_title": issue.title,
-                    "issue_url": issue.html_url,
-                    "created_at": issue.created_at.isoformat() if issue.created_at else None,
-                    "state": issue.state
-                })
+                issues_data.append(_build_issue_document(issue))
                 issue_count += 1
                 
                 # Progress feedback every 25 issues
@@ -753,203 +920,431 @@ def fetch_repo_issues(repo, max_issues=100):
     logger.info(f"✅ Issue fetching complete: {len(issues_data)} {efficiency_msg}")
     return issues_data
 
+def iter_repo_issue_batches(repo, max_issues=100, batch_size=50):
+    """
+    Yield issue documents in batches of batch_size, most recently updated first.
+    
+    Lets ingestion embed the first batches while later pages are still being
+    fetched, instead of materializing every issue up front.
+    """
+    batch = []
+    issue_count = 0
+    try:
+        for issue in repo.get_issues(state="all", sort="updated", direction="desc"):
+            if issue_count >= max_issues:
+                break
+            issue_count += 1  # Failed issues still count toward the limit
+            try:
+                batch.append(_build_issue_document(issue))
+            except Exception as e:
+                logger.warning(f"⚠️ Error processing issue #{issue.number}: {e}")
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    except Exception as e:
+        logger.error(f"❌ Error fetching issues: {e}")
+    if batch:
+        yield batch
+
+async def iter_repo_issue_batches_async(repo, max_issues=100, batch_size=50):
+    """
+    Yield issue document batches, fetching issues and comments through GraphQL.
+    
+    One GraphQL request returns a whole batch with comments nested. If the
+    first request fails (e.g. the token lacks GraphQL access), falls back to
+    the REST fetcher.
+    """
+    yielded = False
+    try:
+        async for nodes in iter_issue_pages(repo.full_name, max_issues, batch_size):
+            batch = []
+            for node in nodes:
+                try:
+                    batch.append(_graphql_issue_document(node))
+                except Exception as e:
+                    logger.warning(f"⚠️ Error processing issue #{node.get('number')}: {e}")
+            yielded = True
+            yield batch
+        return
+    except Exception as e:
+        if yielded:
+            logger.error(f"❌ Error fetching issues: {e}")
+            return
+        logger.warning(f"⚠️ GraphQL issue fetch failed, falling back to REST: {e}")
+    
+    batches = iter_repo_issue_batches(repo, max_issues, batch_size)
+    done = object()
+    while True:
+        batch = await asyncio.to_thread(next, batches, done)
+        if batch is done:
+            return
+        yield batch
+
 # --- PROCESSING & UPSERTING ---
-async def chunk_and_embed_and_store(documents, embeddings, collection_name: str, repo_name: str = None):
-    """Optimized chunking and embedding with performance improvements and timeout prevention."""
-    import time
+@functools.lru_cache(maxsize=None)
+def get_text_splitter(chunk_size: int, chunk_overlap: int) -> Callable[[str], List[str]]:
+    """Return a cached split function for the given character budget."""
+    if RustTextSplitter is not None:
+        return RustTextSplitter(chunk_size, overlap=chunk_overlap).chunks
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap).split_text
+
+def _chunk_documents(batch_docs: List[Dict[str, Any]], collection_name: str):
+    """
+    Split a batch of documents into chunks and build their metadata.
+    
+    This is the CPU-bound half of ingestion. It touches no shared state, so it
+    can run in a worker thread or a separate process; splitters are looked up
+    inside the worker rather than pickled across.
     
+    Returns:
+        Tuple of (chunks, metadatas)
+    """
     # OPTIMIZED CHUNKING STRATEGIES - Much larger chunks to reduce total count
+    # Splitters are built once per process and reused across calls
     # Documentation: Large chunks for better context, minimal splitting
-    doc_splitter = RecursiveCharacterTextSplitter(chunk_size=4000, chunk_overlap=200)
+    split_doc = get_text_splitter(4000, 200)
     
     # Code: Even larger chunks to preserve function/class integrity
-    code_splitter = RecursiveCharacterTextSplitter(chunk_size=6000, chunk_overlap=300)
+    split_code = get_text_splitter(6000, 300)
     
     # Issues/PRs: Moderate chunks but aggressive limits
-    issue_pr_splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=250)
+    split_issue_pr = get_text_splitter(5000, 250)
     
+    all_chunks = []
+    all_metadatas = []
+    
+    # INTELLIGENT CHUNKING based on content importance
+    for doc in batch_docs:
+        doc_type = doc.get("type", "")
+        content = doc["content"]
+        content_length = len(content)
+
+        # CONTENT-AWARE CHUNKING STRATEGY
+        if doc_type == "doc":
+            # DOCUMENTATION - Highest priority, preserve context
+            if content_length <= 3000:
+                # Small docs: keep whole for perfect context
+                chunks = [content]
+            elif content_length <= 8000:
+                # Medium docs: minimal chunking
+                chunks = split_doc(content)
+                if len(chunks) > 3:
+                    # Merge small chunks to reduce total count
+                    merged_chunks = []
+                    current_chunk = ""
+                    for chunk in chunks:
+                        if len(current_chunk + chunk) <= 5000:
+                            current_chunk += "\n\n" + chunk if current_chunk else chunk
+                        else:
+                            if current_chunk:
+                                merged_chunks.append(current_chunk)
+                            current_chunk = chunk
+                    if current_chunk:
+                        merged_chunks.append(current_chunk)
+                    chunks = merged_chunks[:3]  # Max 3 chunks for docs
+            else:
+                # Large docs: controlled chunking
+                chunks = split_doc(content)[:4]  # Max 4 chunks for large docs
+
+        elif doc_type == "code":
+            # CODE - Second highest priority, preserve function boundaries
+            if content_length <= 4000:
+                # Small code: keep whole to preserve structure
+                chunks = [content]
+            elif content_length <= 10000:
+                # Medium code: careful chunking
+                chunks = split_code(content)
+                if len(chunks) > 2:
+                    chunks = chunks[:2]  # Max 2 chunks for code files
+            else:
+                # Large code: strategic chunking
+                chunks = split_code(content)[:3]  # Max 3 chunks for large code
+
+        elif doc_type in ["issue", "pr"]:
+            # ISSUES/PRs - Can be more aggressive to save processing time
+            if content_length <= 6000:
+                # Small/medium: keep whole
+                chunks = [content]
+            else:
+                # Large: aggressive chunking with strict limits
+                chunks = split_issue_pr(content)
+                chunks = chunks[:2]  # Max 2 chunks for issues/PRs
+        else:
+            # Fallback: Conservative chunking
+            if content_length <= 4000:
+                chunks = [content]
+            else:
+                chunks = split_doc(content)[:3]
+
+        # Create metadata efficiently
+        for j, chunk in enumerate(chunks):
+            metadata = {
+                "source": doc["source"],
+                "type": doc_type,
+                "collection_name": collection_name,
+                "chunk_index": j,
+                "original_doc_length": content_length,
+                "total_chunks": len(chunks)
+            }
+
+            # Add type-specific metadata only when needed
+            if doc_type == "code":
+                metadata.update({
+                    "filePath": doc.get("filePath", ""),
+                    "functionName": doc.get("functionName", ""),
+                    "functionType": doc.get("functionType", ""),
+                    "branch": doc.get("branch", "main"),
+                    "start_line": doc.get("start_line"),
+                    "end_line": doc.get("end_line")
+                })
+            elif doc_type == "pr":
+                metadata.update({
+                    "pr_number": doc.get("pr_number"),
+                    "pr_title": doc.get("pr_title", ""),
+                    "pr_url": doc.get("pr_url", ""),
+                    "merged_at": doc.get("merged_at")
+                })
+            elif doc_type == "issue":
+                metadata.update({
+                    "issue_number": doc.get("issue_number"),
+                    "issue_title": doc.get("issue_title", ""),
+                    "issue_url": doc.get("issue_url", ""),
+                    "created_at": doc.get("created_at"),
+                    "issue_state": doc.get("state", "")
+                })
+
+            all_chunks.append(chunk)
+            all_metadatas.append(metadata)
+    
+    return all_chunks, all_metadatas
+
+# Language tags for the context header prepended to chunks before embedding
+_LANGUAGE_BY_EXTENSION = {
+    ".py": "python", ".js": "javascript", ".jsx": "javascript", ".ts": "typescript",
+    ".tsx": "typescript", ".java": "java", ".go": "go", ".rs": "rust", ".cpp": "cpp",
+    ".c": "c", ".h": "c", ".cs": "csharp", ".php": "php", ".rb": "ruby", ".swift": "swift",
+    ".md": "markdown", ".rst": "rst", ".txt": "text",
+}
+
+def _detect_language(path: str) -> str:
+    """Best-effort language tag from a file path ('' when unknown)."""
+    return _LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), "")
+
+def _contextual_text(doc: Document) -> str:
+    """
+    Text to embed for a chunk: a one-line header naming its repository, source
+    and language, followed by the chunk. Anchoring chunks to their file makes
+    retrieval match on location as well as content.
+    """
+    metadata = doc.metadata
+    header = f"[repo={metadata.get('repo', '')}][path={metadata.get('filePath') or metadata['source']}]"
+    if metadata.get("lang"):
+        header += f"[lang={metadata['lang']}]"
+    return f"{header}\n{doc.page_content}"
+
+def _chunk_id(source: str, chunk: str) -> str:
+    """Deterministic id for a stored chunk, derived from its source and content."""
+    return hashlib.sha256(f"{source}\0{chunk}".encode("utf-8")).hexdigest()
+
+# Optional process pool for chunking; 0 keeps chunking in a worker thread
+CHUNK_PROCESS_WORKERS = int(os.getenv("CHUNK_PROCESS_WORKERS", "0"))
+_chunk_pool = None
+
+async def _run_chunking(batch_docs: List[Dict[str, Any]], collection_name: str):
+    """Chunk a batch off the event loop, fanning out across processes when configured."""
+    global _chunk_pool
+    if CHUNK_PROCESS_WORKERS <= 0 or len(batch_docs) < 2:
+        return await asyncio.to_thread(_chunk_documents, batch_docs, collection_name)
+    
+    if _chunk_pool is None:
+        _chunk_pool = ProcessPoolExecutor(max_workers=CHUNK_PROCESS_WORKERS)
+    loop = asyncio.get_running_loop()
+    slice_size = -(-len(batch_docs) // CHUNK_PROCESS_WORKERS)
+    results = await asyncio.gather(*[
+        loop.run_in_executor(_chunk_pool, _chunk_documents, batch_docs[i:i + slice_size], collection_name)
+        for i in range(0, len(batch_docs), slice_size)
+    ])
+    all_chunks, all_metadatas = [], []
+    for chunks, metadatas in results:
+        all_chunks.extend(chunks)
+        all_metadatas.extend(metadatas)
+    return all_chunks, all_metadatas
+
+def _source_batches(documents: List[Dict[str, Any]], batch_size: int) -> List[List[Dict[str, Any]]]:
+    """
+    Split documents into batches of about `batch_size` without splitting a source.
+
+    Stale-chunk cleanup compares a batch's new chunk ids against everything
+    stored for its sources, so all documents of one source (e.g. the several
+    chunks fetch_repo_code emits per file) must be processed in the same batch.
+    A source with more than `batch_size` documents gets a batch of its own.
+    """
+    by_source: Dict[str, List[Dict[str, Any]]] = {}
+    for doc in documents:
+        by_source.setdefault(doc["source"], []).append(doc)
+    
+    batches, current = [], []
+    for group in by_source.values():
+        if current and len(current) + len(group) > batch_size:
+            batches.append(current)
+            current = []
+        current.extend(group)
+    if current:
+        batches.append(current)
+    return batches
+
+class IncompleteIngestionError(Exception):
+    """Raised when some chunks could not be embedded or stored; `stored` counts those that were."""
+
+    def __init__(self, stored: int, failed: int):
+        super().__init__(f"{failed} chunks could not be embedded or stored ({stored} stored)")
+        self.stored = stored
+        self.failed = failed
+
+async def chunk_and_embed_and_store(documents, embeddings, collection_name: str, repo_name: str = None,
+                                    raise_on_failure: bool = False):
+    """
+    Optimized chunking and embedding with performance improvements and timeout prevention.
+    
+    A sub-batch that fails to embed or store is logged and skipped so the rest
+    still lands. With raise_on_failure, IncompleteIngestionError is raised at the
+    end if any chunk was skipped, so callers can tell a partial run from a full one.
+    """
     # PERFORMANCE OPTIMIZATIONS
     batch_size = 100  # Larger batches for efficiency
-    embedding_batch_size = 100  # Much larger embedding batches
+    # Each sub-batch is embedded in one request and written in one Chroma upsert;
+    # local ONNX models use their own batch size
+    embedding_batch_size = getattr(embeddings, "batch_size", 256)
     total_documents_stored = 0
     total_chunks_created = 0
-    start_time = time.time()
+    failed_chunks = 0
+    start_time = time.perf_counter()
     
     logger.info(f"🚀 OPTIMIZED Processing {len(documents)} documents for collection '{collection_name}' (repo: {repo_name})...")
     logger.info(f"📊 Target: Minimize chunks while preserving quality for {collection_name}")
     
-    # Create/get the Chroma collection with repository-specific naming
-    chroma_collection = create_chroma_collection(embeddings, collection_name, repo_name)
+    # Create/get the Chroma collection with repository-specific naming. Vectors are
+    # computed here (from the chunk with its context header), so writes go straight
+    # to the underlying chromadb collection rather than through the LangChain wrapper.
+    create_chroma_collection(embeddings, collection_name, repo_name)
+    collection = get_chroma_client(CHROMA_PERSIST_DIR).get_collection(
+        _full_collection_name(collection_name, repo_name)
+    )
     
-    # Process in larger batches for efficiency
-    for i in tqdm(range(0, len(documents), batch_size), desc=f"Processing {collection_name} efficiently"):
-        batch_start_time = time.time()
-        batch_docs = documents[i:i + batch_size]
-        
-        all_chunks = []
-        all_metadatas = []
-        batch_chunks_created = 0
-        
-        # 1. INTELLIGENT CHUNKING based on content importance
-        for doc_idx, doc in enumerate(batch_docs):
-            doc_type = doc.get("type", "")
-            content = doc["content"]
-            content_length = len(content)
+    # Process in larger batches for efficiency; a source never spans two batches
+    # Chunking of the next batch (CPU) runs while the current batch is embedded
+    batches = _source_batches(documents, batch_size)
+    docs_processed = 0
+    next_chunking = None
+    if batches:
+        next_chunking = asyncio.create_task(_run_chunking(batches[0], collection_name))
+    try:
+        for batch_number, batch_docs in enumerate(tqdm(batches, desc=f"Processing {collection_name} efficiently"), 1):
+            batch_start_time = time.perf_counter()
+            docs_processed += len(batch_docs)
             
-            # CONTENT-AWARE CHUNKING STRATEGY
-            if doc_type == "doc":
-                # DOCUMENTATION - Highest priority, preserve context
-                if content_length <= 3000:
-                    # Small docs: keep whole for perfect context
-                    chunks = [content]
-                elif content_length <= 8000:
-                    # Medium docs: minimal chunking
-                    chunks = doc_splitter.split_text(content)
-                    if len(chunks) > 3:
-                        # Merge small chunks to reduce total count
-                        merged_chunks = []
-                        current_chunk = ""
-                        for chunk in chunks:
-                            if len(current_chunk + chunk) <= 5000:
-                                current_chunk += "\n\n" + chunk if current_chunk else chunk
-                            else:
-                                if current_chunk:
-                                    merged_chunks.append(current_chunk)
-                                current_chunk = chunk
-                        if current_chunk:
-                            merged_chunks.append(current_chunk)
-                        chunks = merged_chunks[:3]  # Max 3 chunks for docs
-                else:
-                    # Large docs: controlled chunking
-                    chunks = doc_splitter.split_text(content)[:4]  # Max 4 chunks for large docs
-                    
-            elif doc_type == "code":
-                # CODE - Second highest priority, preserve function boundaries
-                if content_length <= 4000:
-                    # Small code: keep whole to preserve structure
-                    chunks = [content]
-                elif content_length <= 10000:
-                    # Medium code: careful chunking
-                    chunks = code_splitter.split_text(content)
-                    if len(chunks) > 2:
-                        chunks = chunks[:2]  # Max 2 chunks for code files
-                else:
-                    # Large code: strategic chunking
-                    chunks = code_splitter.split_text(content)[:3]  # Max 3 chunks for large code
-                    
-            elif doc_type in ["issue", "pr"]:
-                # ISSUES/PRs - Can be more aggressive to save processing time
-                if content_length <= 6000:
-                    # Small/medium: keep whole
-                    chunks = [content]
-                else:
-                    # Large: aggressive chunking with strict limits
-                    chunks = issue_pr_splitter.split_text(content)
-                    chunks = chunks[:2]  # Max 2 chunks for issues/PRs
-            else:
-                # Fallback: Conservative chunking
-                if content_length <= 4000:
-                    chunks = [content]
-                else:
-                    chunks = doc_splitter.split_text(content)[:3]
+            # 1. INTELLIGENT CHUNKING based on content importance (off the event loop)
+            all_chunks, all_metadatas = await next_chunking
+            next_chunking = None
+            if batch_number < len(batches):
+                next_chunking = asyncio.create_task(_run_chunking(batches[batch_number], collection_name))
+            batch_chunks_created = len(all_chunks)
             
-            batch_chunks_created += len(chunks)
+            total_chunks_created += batch_chunks_created
+            batch_time = time.perf_counter() - batch_start_time
             
-            # Create metadata efficiently
-            for j, chunk in enumerate(chunks):
-                metadata = {
-                    "source": doc["source"],
-                    "type": doc_type,
-                    "collection_name": collection_name,
-                    "chunk_index": j,
-                    "original_doc_length": content_length,
-                    "total_chunks": len(chunks)
-                }
-                
-                # Add type-specific metadata only when needed
-                if doc_type == "code":
-                    metadata.update({
-                        "filePath": doc.get("filePath", ""),
-                        "functionName": doc.get("functionName", ""),
-                        "functionType": doc.get("functionType", ""),
-                        "branch": doc.get("branch", "main"),
-                        "start_line": doc.get("start_line"),
-                        "end_line": doc.get("end_line")
-                    })
-                elif doc_type == "pr":
-                    metadata.update({
-                        "pr_number": doc.get("pr_number"),
-                        "pr_title": doc.get("pr_title", ""),
-                        "pr_url": doc.get("pr_url", ""),
-                        "merged_at": doc.get("merged_at")
-                    })
-                elif doc_type == "issue":
-                    metadata.update({
-                        "issue_number": doc.get("issue_number"),
-                        "issue_title": doc.get("issue_title", ""),
-                        "issue_url": doc.get("issue_url", ""),
-                        "created_at": doc.get("created_at"),
-                        "issue_state": doc.get("state", "")
-                    })
-                
-                all_chunks.append(chunk)
-                all_metadatas.append(metadata)
+            # Enhanced progress logging
+            logger.info(f"📦 Batch {batch_number}: {len(batch_docs)} docs → {batch_chunks_created} chunks (⏱️ {batch_time:.1f}s)")
+            logger.info(f"📊 Total progress: {total_chunks_created} chunks from {docs_processed} docs")
             
-            # Smart yielding based on time and count
-            if doc_idx % 10 == 0 or time.time() - batch_start_time > 2.0:
-                await asyncio.sleep(0.01)  # Micro-yield to prevent timeout
-        
-        total_chunks_created += batch_chunks_created
-        batch_time = time.time() - batch_start_time
-        
-        # Enhanced progress logging
-        logger.info(f"📦 Batch {i//batch_size + 1}: {len(batch_docs)} docs → {batch_chunks_created} chunks (⏱️ {batch_time:.1f}s)")
-        logger.info(f"📊 Total progress: {total_chunks_created} chunks from {i + len(batch_docs)} docs")
-        
-        if not all_chunks:
-            continue
-
-        # 2. EFFICIENT DOCUMENT CREATION
-        langchain_docs = [
-            Document(page_content=chunk, metadata=metadata)
-            for chunk, metadata in zip(all_chunks, all_metadatas)
-        ]
-        
-        # 3. OPTIMIZED EMBEDDING AND STORAGE
-        # Use much larger batches for embedding efficiency
-        for start in range(0, len(langchain_docs), embedding_batch_size):
-            end = start + embedding_batch_size
-            sub_batch = langchain_docs[start:end]
-            embed_start_time = time.time()
+            if not all_chunks:
+                continue
+
+            # 2. EFFICIENT DOCUMENT CREATION
+            # Content-derived ids: unchanged chunks map to ids already in the collection
+            docs_by_id = {}
+            for chunk, metadata in zip(all_chunks, all_metadatas):
+                if repo_name:
+                    metadata["repo"] = repo_name
+                metadata["lang"] = _detect_language(metadata.get("filePath") or metadata["source"])
+                docs_by_id.setdefault(_chunk_id(metadata["source"], chunk),
+                                      Document(page_content=chunk, metadata=metadata))
             
+            # Chunks already stored for these sources: unchanged ones are skipped (embedding
+            # is the expensive part), and ones whose content changed since are removed.
+            # The batch holds every document of its sources, so docs_by_id is complete.
+            sources = list({doc.metadata["source"] for doc in docs_by_id.values()})
             try:
-                # Single large embedding call for efficiency
-                await asyncio.to_thread(chroma_collection.add_documents, sub_batch)
-                total_documents_stored += len(sub_batch)
-                embed_time = time.time() - embed_start_time
-                
-                # Concise progress logging
-                logger.info(f"✅ Embedded {len(sub_batch)} chunks (⏱️ {embed_time:.1f}s) | Total: {total_documents_stored}")
+                stored = await asyncio.to_thread(
+                    collection.get, where={"source": {"$in": sources}}, include=[]
+                )
+                stored_ids = set(stored["ids"])
+            except Exception as e:
+                logger.warning(f"⚠️ Could not check for existing chunks: {e}")
+                stored_ids = set()
+            existing_ids = stored_ids.intersection(docs_by_id)
+            stale_ids = stored_ids.difference(docs_by_id)
+            if stale_ids:
+                try:
+                    await asyncio.to_thread(collection.delete, ids=list(stale_ids))
+                    logger.info(f"🧹 Removed {len(stale_ids)} outdated chunks of changed sources")
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not remove outdated chunks: {e}")
+            if existing_ids:
+                logger.info(f"♻️ Skipping {len(existing_ids)} unchanged chunks already stored")
+                total_documents_stored += len(existing_ids)
+            chunk_ids = [chunk_id for chunk_id in docs_by_id if chunk_id not in existing_ids]
+            
+            # 3. OPTIMIZED EMBEDDING AND STORAGE
+            # Use much larger batches for embedding efficiency
+            for start in range(0, len(chunk_ids), embedding_batch_size):
+                end = start + embedding_batch_size
+                sub_ids = chunk_ids[start:end]
+                sub_batch = [docs_by_id[chunk_id] for chunk_id in sub_ids]
+                embed_start_time = time.perf_counter()
                 
-                # Intelligent yielding based on time
-                if embed_time > 1.0:
-                    await asyncio.sleep(0.05)  # Longer yield for slow operations
-                else:
-                    await asyncio.sleep(0.01)  # Quick yield for fast operations
+                try:
+                    # Single large embedding call for efficiency. The vector is computed
+                    # from the chunk with its context header; the stored document is the raw chunk.
+                    vectors = await asyncio.to_thread(
+                        embeddings.embed_documents, [_contextual_text(doc) for doc in sub_batch]
+                    )
+                    await asyncio.to_thread(
+                        collection.upsert,
+                        ids=sub_ids,
+                        embeddings=vectors,
+                        documents=[doc.page_content for doc in sub_batch],
+                        metadatas=[doc.metadata for doc in sub_batch]
+                    )
+                    total_documents_stored += len(sub_batch)
+                    embed_time = time.perf_counter() - embed_start_time
+                    
+                    logger.debug("Embedded %d chunks (%.1fs) | Total: %d", len(sub_batch), embed_time, total_documents_stored)
+                    
+                    # Intelligent yielding based on time
+                    if embed_time > 1.0:
+                        await asyncio.sleep(0.05)  # Longer yield for slow operations
+                    else:
+                        await asyncio.sleep(0.01)  # Quick yield for fast operations
                 
-            except Exception as e:
-                logger.error(f"❌ Embedding error: {e}")
-                continue
-        
-        # Progress checkpoint every batch
-        total_time = time.time() - start_time
-        if total_time > 10:  # Every 10 seconds, give progress update
-            remaining_docs = len(documents) - (i + len(batch_docs))
-            logger.info(f"🔄 PROGRESS: {total_documents_stored} chunks stored | {remaining_docs} docs remaining")
-            start_time = time.time()  # Reset timer
+                except Exception as e:
+                    logger.error(f"❌ Embedding error: {e}")
+                    failed_chunks += len(sub_batch)
+                    continue
+            
+            # Progress checkpoint every batch
+            total_time = time.perf_counter() - start_time
+            if total_time > 10:  # Every 10 seconds, give progress update
+                remaining_docs = len(documents) - docs_processed
+                logger.info(f"🔄 PROGRESS: {total_documents_stored} chunks stored | {remaining_docs} docs remaining")
+                start_time = time.perf_counter()  # Reset timer
+    finally:
+        if next_chunking is not None:
+            next_chunking.cancel()
     
     # Final summary with efficiency metrics
-    total_time = time.time() - start_time
+    total_time = time.perf_counter() - start_time
     efficiency_ratio = len(documents) / total_documents_stored if total_documents_stored > 0 else 0
     
     logger.info(f"🎉 COMPLETED {collection_name}:")
@@ -957,17 +1352,98 @@ async def chunk_and_embed_and_store(documents, embeddings, collection_name: str,
     logger.info(f"  📊 Efficiency ratio: {efficiency_ratio:.2f} docs/chunk (higher = better)")
     logger.info(f"  ⏱️  Total time: {total_time:.1f} seconds")
     
+    if failed_chunks:
+        logger.warning(f"⚠️ {failed_chunks} chunks of {collection_name} were not stored")
+        if raise_on_failure:
+            raise IncompleteIngestionError(total_documents_stored, failed_chunks)
     return total_documents_stored
 
 
+async def chunk_and_embed_and_store_stream(batches, embeddings, collection_name: str,
+                                          repo_name: str = None, queue_size: int = 4):
+    """
+    Pipeline fetching and embedding through a bounded queue.
+    
+    A producer pulls document batches from `batches` (a sync iterator run in a
+    worker thread, or an async iterator) while the consumer chunks, embeds and
+    stores the previous batch. At most `queue_size` batches are held in memory.
+    
+    Returns:
+        Tuple of (documents_fetched, chunks_stored)
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    done = object()
+    loop = asyncio.get_running_loop()
+    
+    def produce_sync():
+        for batch in batches:
+            asyncio.run_coroutine_threadsafe(queue.put(batch), loop).result()
+    
+    async def produce():
+        try:
+            if hasattr(batches, "__aiter__"):
+                async for batch in batches:
+                    await queue.put(batch)
+            else:
+                await asyncio.to_thread(produce_sync)
+        finally:
+            await queue.put(done)
+    
+    async def consume():
+        fetched = stored = 0
+        while True:
+            batch = await queue.get()
+            if batch is done:
+                return fetched, stored
+            fetched += len(batch)
+            stored += await chunk_and_embed_and_store(batch, embeddings, collection_name, repo_name)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        fetched, stored = await consume()
+    finally:
+        if not producer.done():
+            producer.cancel()
+    # Surface producer errors (the consumer has already drained what was fetched)
+    if producer.done() and not producer.cancelled() and producer.exception():
+        raise producer.exception()
+    return fetched, stored
+
+
 # --- VALIDATION & STATS ---
+# Seconds a fetched repository object is reused; validation and info tools
+# often look up the same repository several times per request
+GITHUB_REPO_CACHE_TTL = float(os.getenv("GITHUB_REPO_CACHE_TTL", "30"))
+_repo_lookup_cache: Dict[str, Any] = {}
+
+def get_repo_cached(repo_name: str):
+    """
+    Return the PyGithub repository, reusing a lookup younger than GITHUB_REPO_CACHE_TTL.
+    
+    Failed lookups (404, 401, 403, ...) raise and are never cached.
+    """
+    now = time.monotonic()
+    cached = _repo_lookup_cache.get(repo_name)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    repo = get_github_client().get_repo(repo_name)
+    _repo_lookup_cache[repo_name] = (now + GITHUB_REPO_CACHE_TTL, repo)
+    return repo
+
+# "owner/repo" as GitHub allows it; anything else cannot exist, so it is
+# rejected without spending an API request
+_REPO_NAME_RE = re.compile(r"[A-Za-z0-9-]+/[A-Za-z0-9_.-]+")
+
 def validate_repo_exists(repo_name: str) -> bool:
     """Validate that a GitHub repository exists and is accessible."""
+    if not _REPO_NAME_RE.fullmatch(repo_name):
+        logger.error(f"Repository validation failed: '{repo_name}' is not in 'owner/repo' format")
+        return False
     try:
-        github_client, _ = initialize_clients()
-        repo = github_client.get_repo(repo_name)
+        get_repo_cached(repo_name)
         return True
     except Exception as e:
+        _repo_lookup_cache.pop(repo_name, None)
         logger.error(f"Repository validation failed: {e}")
         return False
 
@@ -3,11 +3,17 @@
 import os
 import re
 import json
+import math
+import time
+import copy
+import hashlib
 import tempfile
 import subprocess
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 # Configure logging
@@ -16,7 +22,10 @@ logger = logging.getLogger(__name__)
 from github import Github
 from langchain_chroma import Chroma
 import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from .embeddings import get_embeddings, get_collection_metadata
+from .vectorstore import get_chroma_client, collection_prefix
 
 # --- Configuration ---
 load_dotenv()
@@ -40,20 +49,115 @@ for var_name, var_value in required_vars.items():
     if not var_value:
         raise ValueError(f"Required environment variable {var_name} is not set in .env file")
 
+# Patch cache: reuse results for identical issues in the same repo. Reusing a
+# near-duplicate issue's patch is opt-in: short issue bodies about different
+# problems can embed very close together. 0 disables the near-duplicate tier.
+PATCH_CACHE_TTL = float(os.getenv("PATCH_CACHE_TTL", "3600"))
+PATCH_CACHE_SIMILARITY = float(os.getenv("PATCH_CACHE_SIMILARITY") or 0)
+PATCH_CACHE_MAX_ENTRIES = int(os.getenv("PATCH_CACHE_MAX_ENTRIES", "128"))
+
 # --- Helper Functions ---
 
+class PatchCache:
+    """
+    Two-tier cache of generated patches.
+
+    The first tier is an exact match on SHA-256 of (repo, issue body) and costs
+    nothing to check. The second tier, enabled when `similarity` is non-zero,
+    compares the issue embedding against earlier issues of the same repository
+    and returns a cached patch when the cosine similarity reaches `similarity`.
+    Entries expire after `ttl` seconds;
+    each repository keeps at most `max_entries`, least recently used first out.
+    """
+
+    def __init__(self, ttl: float = PATCH_CACHE_TTL, similarity: float = PATCH_CACHE_SIMILARITY,
+                 max_entries: int = PATCH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.similarity = similarity
+        self.max_entries = max_entries
+        # repo -> OrderedDict[key -> (stored_at, unit_vector, patch_data)]
+        self._entries: Dict[str, "OrderedDict[str, tuple]"] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(repo_full_name: str, issue_body: str) -> str:
+        return hashlib.sha256(f"{repo_full_name}\0{issue_body}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def _live_entries(self, repo_full_name: str) -> "OrderedDict[str, tuple]":
+        entries = self._entries.setdefault(repo_full_name, OrderedDict())
+        cutoff = time.monotonic() - self.ttl
+        for key in [key for key, (stored_at, _, _) in entries.items() if stored_at < cutoff]:
+            del entries[key]
+        return entries
+
+    def get_exact(self, repo_full_name: str, issue_body: str) -> Optional[Dict[str, Any]]:
+        key = self._key(repo_full_name, issue_body)
+        with self._lock:
+            entries = self._live_entries(repo_full_name)
+            if key not in entries:
+                return None
+            entries.move_to_end(key)
+            return copy.deepcopy(entries[key][2])
+
+    def get_similar(self, repo_full_name: str, vector: List[float]) -> Optional[Dict[str, Any]]:
+        if not self.similarity:
+            return None
+        unit = self._normalize(vector)
+        with self._lock:
+            entries = self._live_entries(repo_full_name)
+            best_key, best_score = None, self.similarity
+            for key, (_, cached_unit, _) in entries.items():
+                score = sum(a * b for a, b in zip(unit, cached_unit))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            entries.move_to_end(best_key)
+            return copy.deepcopy(entries[best_key][2])
+
+    def put(self, repo_full_name: str, issue_body: str, vector: List[float], patch_data: Dict[str, Any]):
+        key = self._key(repo_full_name, issue_body)
+        with self._lock:
+            entries = self._live_entries(repo_full_name)
+            entries[key] = (time.monotonic(), self._normalize(vector), copy.deepcopy(patch_data))
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, repo_full_name: str):
+        """Drop every cached patch for a repository (e.g. after re-ingestion)."""
+        with self._lock:
+            self._entries.pop(repo_full_name, None)
+
+
+_patch_cache = PatchCache()
+
+def get_patch_cache() -> PatchCache:
+    """Return the process-wide patch cache."""
+    return _patch_cache
+
+
+# Compiled once; every LLM patch response is run through these
+_JSON_FENCE_RE = re.compile(r'```json\s*\n(.*?)\n\s*```', re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r'(\{.*\})', re.DOTALL)
+
 def _extract_json_from_response(text: str) -> str:
     """
     Aggressively finds and extracts a JSON object from a string.
     Handles markdown code fences, leading/trailing text, and partial objects.
     """
     # Pattern to find JSON enclosed in ```json ... ```
-    match = re.search(r'```json\s*\n(.*?)\n\s*```', text, re.DOTALL)
+    match = _JSON_FENCE_RE.search(text)
     if match:
         return match.group(1).strip()
 
     # Fallback pattern for a simple JSON object `{...}`
-    match = re.search(r'(\{.*\})', text, re.DOTALL)
+    match = _JSON_OBJECT_RE.search(text)
     if match:
         return match.group(1).strip()
         
@@ -61,7 +165,7 @@ def _extract_json_from_response(text: str) -> str:
 
 def initialize_chroma_clients(repo_name: str):
     """Initialize Chroma client and vector stores for both collections with repository-specific names."""
-    logger.info(f"Initializing Chroma clients for patch generation (repo: {repo_name})...")
+    logger.info("Initializing Chroma clients for patch generation (repo: %s)...", repo_name)
     try:
         # Check if Chroma database exists
         if not os.path.exists(CHROMA_PERSIST_DIR):
@@ -70,43 +174,47 @@ def initialize_chroma_clients(repo_name: str):
                 f"Please run the ingestion script first."
             )
         
-        # Initialize embeddings
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001", 
-            google_api_key=GOOGLE_API_KEY
-        )
+        # Initialize embeddings (must match the model used at ingestion time)
+        embeddings = get_embeddings()
         
         # Create repository-specific collection names
-        safe_repo_name = repo_name.replace('/', '_').replace('-', '_').lower()
+        safe_repo_name = collection_prefix(repo_name)
         pr_collection_name = f"{safe_repo_name}_pr_history"
         code_collection_name = f"{safe_repo_name}_repo_code_main"
         
-        logger.info(f"Using collections: {pr_collection_name}, {code_collection_name}")
+        logger.info("Using collections: %s, %s", pr_collection_name, code_collection_name)
         
         # Create vector stores for both collections
         pr_history_store = Chroma(
             embedding_function=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR,
-            collection_name=pr_collection_name
+            client=get_chroma_client(CHROMA_PERSIST_DIR),
+            collection_name=pr_collection_name,
+            collection_metadata=get_collection_metadata()
         )
         
         repo_code_store = Chroma(
             embedding_function=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR,
-            collection_name=code_collection_name
+            client=get_chroma_client(CHROMA_PERSIST_DIR),
+            collection_name=code_collection_name,
+            collection_metadata=get_collection_metadata()
         )
         
         return pr_history_store, repo_code_store
     except Exception as e:
         raise Exception(f"Failed to initialize Chroma clients: {e}")
 
-def query_vector_stores(issue_body: str, pr_history_store, repo_code_store, k: int = 5):
+def query_vector_stores(issue_body: str, pr_history_store, repo_code_store, k: int = 5,
+                        query_vector: Optional[List[float]] = None):
     """Query both vector stores for relevant context."""
     logger.info("Querying vector stores for relevant context...")
     
     try:
+        # Embed the issue once and search both collections with the same vector
+        if query_vector is None:
+            query_vector = pr_history_store.embeddings.embed_query(issue_body)
+        
         # Query PR history
-        pr_results = pr_history_store.similarity_search(issue_body, k=k)
+        pr_results = pr_history_store.similarity_search_by_vector(query_vector, k=k)
         pr_context = []
         for doc in pr_results:
             pr_context.append({
@@ -115,7 +223,7 @@ def query_vector_stores(issue_body: str, pr_history_store, repo_code_store, k: i
             })
         
         # Query repository code
-        code_results = repo_code_store.similarity_search(issue_body, k=k)
+        code_results = repo_code_store.similarity_search_by_vector(query_vector, k=k)
         code_context = []
         for doc in code_results:
             code_context.append({
@@ -151,43 +259,19 @@ def format_context_for_llm(pr_context: List[Dict], code_context: List[Dict]) ->
     
     return formatted_context
 
-def generate_patch_for_issue(issue_body: str, repo_full_name: str = None) -> Dict[str, Any]:
-    """
-    Generate patch suggestions for a GitHub issue.
-    
-    Args:
-        issue_body: The body text of the GitHub issue
-        repo_full_name: Repository name for context (required for repository-specific collections)
-        
-    Returns:
-        Dictionary with filesToUpdate and summaryOfChanges
-    """
-    logger.info("Starting patch generation process...")
-    
-    if not repo_full_name:
-        raise ValueError("repo_full_name is required for patch generation")
-    
-    try:
-        # Initialize vector stores with repository-specific collections
-        pr_history_store, repo_code_store = initialize_chroma_clients(repo_full_name)
-        
-        # Query both collections
-        pr_context, code_context = query_vector_stores(issue_body, pr_history_store, repo_code_store)
-        
-        # Format context for LLM
-        context_text = format_context_for_llm(pr_context, code_context)
-        
-        # Initialize LLM with rate limit handling
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash", 
-            temperature=0.1, 
-            google_api_key=GOOGLE_API_KEY,
-            max_retries=2,  # Reduce retries
-            request_timeout=30  # Shorter timeout
-        )
-        
-        # Construct the prompt
-        prompt = f"""You are a senior software engineer tasked with creating precise code patches to resolve a GitHub issue.
+def _create_patch_llm():
+    """LLM used for patch generation (rate-limit friendly settings)."""
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash", 
+        temperature=0.1, 
+        google_api_key=GOOGLE_API_KEY,
+        max_retries=2,  # Reduce retries
+        request_timeout=30  # Shorter timeout
+    )
+
+def _build_patch_prompt(issue_body: str, context_text: str) -> str:
+    """Construct the patch generation prompt for one issue."""
+    return f"""You are a senior software engineer tasked with creating precise code patches to resolve a GitHub issue.
 
 GitHub Issue:
 {issue_body}
@@ -224,49 +308,158 @@ Rules for patch generation:
 
 Generate the patches now:"""
 
-        # Get LLM response with error handling
-        try:
-            response = llm.invoke(prompt)
-        except Exception as e:
-            error_message = str(e)
-            if "429" in error_message or "quota" in error_message.lower():
-                logger.warning("⚠️ Google API rate limit exceeded for patch generation")
-                return {
-                    "filesToUpdate": [],
-                    "summaryOfChanges": "Patch generation skipped due to API rate limits. Please try again later or resolve manually."
-                }
-            raise e
+def _rate_limited_result() -> Dict[str, Any]:
+    return {
+        "filesToUpdate": [],
+        "summaryOfChanges": "Patch generation skipped due to API rate limits. Please try again later or resolve manually."
+    }
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    error_message = str(error)
+    return "429" in error_message or "quota" in error_message.lower()
+
+def _parse_patch_response(response) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse the LLM response into patch data.
+    
+    Returns:
+        Tuple of (patch_data, parsed). When no JSON could be parsed, patch_data
+        is an empty patch whose summary carries the error and parsed is False.
+    """
+    response_text = response.content if hasattr(response, 'content') else str(response)
+    
+    # Use the new helper to clean the response before parsing
+    json_str = _extract_json_from_response(response_text)
+    
+    try:
+        patch_data = json.loads(json_str)
+    except json.JSONDecodeError as e:
+        error_message = f"Error: Failed to parse a valid JSON patch from the AI's response. Please try again. Error details: {e}"
+        logger.error(error_message)
+        logger.error(f"Raw response was: {response_text}")
+        return {
+            "filesToUpdate": [],
+            "summaryOfChanges": error_message
+        }, False
+    
+    # Validate the structure
+    if "filesToUpdate" not in patch_data or "summaryOfChanges" not in patch_data:
+        raise ValueError("Invalid patch data structure: Missing required keys 'filesToUpdate' or 'summaryOfChanges'.")
+    
+    logger.info("Successfully generated and parsed patch for %d files.", len(patch_data['filesToUpdate']))
+    return patch_data, True
+
+def generate_patch_for_issue(issue_body: str, repo_full_name: str = None, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Generate patch suggestions for a GitHub issue.
+    
+    Args:
+        issue_body: The body text of the GitHub issue
+        repo_full_name: Repository name for context (required for repository-specific collections)
+        use_cache: Reuse a cached patch for an identical issue (or near-duplicate when enabled)
         
-        # Parse JSON response
-        try:
-            response_text = response.content if hasattr(response, 'content') else str(response)
-            
-            # Use the new helper to clean the response before parsing
-            json_str = _extract_json_from_response(response_text)
-            
-            patch_data = json.loads(json_str)
-            
-            # Validate the structure
-            if "filesToUpdate" not in patch_data or "summaryOfChanges" not in patch_data:
-                raise ValueError("Invalid patch data structure: Missing required keys 'filesToUpdate' or 'summaryOfChanges'.")
+    Returns:
+        Dictionary with filesToUpdate and summaryOfChanges
+    """
+    return generate_patches_for_issues([issue_body], repo_full_name, use_cache)[0]
+
+def generate_patches_for_issues(issue_bodies: List[str], repo_full_name: str = None,
+                                use_cache: bool = True) -> List[Dict[str, Any]]:
+    """
+    Generate patch suggestions for several issues of the same repository.
+    
+    The vector stores and LLM client are set up once for the whole batch, and
+    the LLM prompts for all cache misses are sent together with llm.batch().
+    
+    Args:
+        issue_bodies: Body texts of the GitHub issues
+        repo_full_name: Repository name for context (required for repository-specific collections)
+        use_cache: Reuse cached patches for identical issues (and near-duplicates
+            when PATCH_CACHE_SIMILARITY is set)
+        
+    Returns:
+        One dictionary with filesToUpdate and summaryOfChanges per issue, in order
+    """
+    logger.info("Starting patch generation process for %d issue(s)...", len(issue_bodies))
+    
+    if not repo_full_name:
+        raise ValueError("repo_full_name is required for patch generation")
+    
+    cache = get_patch_cache()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(issue_bodies)
+    if use_cache:
+        for i, issue_body in enumerate(issue_bodies):
+            cached = cache.get_exact(repo_full_name, issue_body)
+            if cached is not None:
+                logger.info("♻️ Returning cached patch (identical issue)")
+                results[i] = cached
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+    
+    try:
+        # Initialize vector stores with repository-specific collections
+        pr_history_store, repo_code_store = initialize_chroma_clients(repo_full_name)
+        
+        # The issue embedding serves both the semantic cache and retrieval
+        query_vectors = {}
+        prompts = {}
+        for i in pending:
+            issue_body = issue_bodies[i]
+            query_vectors[i] = pr_history_store.embeddings.embed_query(issue_body)
+            if use_cache:
+                cached = cache.get_similar(repo_full_name, query_vectors[i])
+                if cached is not None:
+                    logger.info("♻️ Returning cached patch (near-duplicate issue)")
+                    results[i] = cached
+                    continue
             
-            logger.info(f"Successfully generated and parsed patch for {len(patch_data['filesToUpdate'])} files.")
-            return patch_data
+            # Query both collections
+            pr_context, code_context = query_vector_stores(
+                issue_body, pr_history_store, repo_code_store, query_vector=query_vectors[i]
+            )
             
-        except json.JSONDecodeError as e:
-            error_message = f"Error: Failed to parse a valid JSON patch from the AI's response. Please try again. Error details: {e}"
-            logger.error(error_message)
-            logger.error(f"Raw response was: {response_text}")
-            return {
-                "filesToUpdate": [],
-                "summaryOfChanges": error_message
-            }
+            # Format context for LLM
+            context_text = format_context_for_llm(pr_context, code_context)
+            prompts[i] = _build_patch_prompt(issue_body, context_text)
+        
+        if not prompts:
+            return results
+        
+        # Get LLM responses with error handling; prompts run concurrently in one batch call
+        llm = _create_patch_llm()
+        indices = list(prompts)
+        responses = llm.batch([prompts[i] for i in indices], return_exceptions=True)
+        
+        for i, response in zip(indices, responses):
+            try:
+                if isinstance(response, Exception):
+                    if _is_rate_limit_error(response):
+                        logger.warning("⚠️ Google API rate limit exceeded for patch generation")
+                        results[i] = _rate_limited_result()
+                        continue
+                    raise response
+                
+                patch_data, parsed = _parse_patch_response(response)
+                if parsed:
+                    cache.put(repo_full_name, issue_bodies[i], query_vectors[i], patch_data)
+                results[i] = patch_data
+            except Exception as e:
+                logger.error(f"Error in patch generation: {e}")
+                results[i] = {
+                    "filesToUpdate": [],
+                    "summaryOfChanges": f"Error during patch generation: {str(e)}"
+                }
     
     except Exception as e:
         logger.error(f"Error in patch generation: {e}")
-        return {
-            "filesToUpdate": [],
-            "summaryOfChanges": f"Error during patch generation: {str(e)}"
-        }
+        for i in pending:
+            if results[i] is None:
+                results[i] = {
+                    "filesToUpdate": [],
+                    "summaryOfChanges": f"Error during patch generation: {str(e)}"
+                }
+    
+    return results
 
-# The main execution block is removed to convert this file into a library module. 
\ No newline at end of file
+# The main execution block is removed to convert this file into a library module.
@@ -0,0 +1,133 @@
+"""
+Rate limiting for GitHub API access.
+
+GitHub enforces an hourly request quota plus secondary limits on concurrent
+requests. GitHubRateLimiter caps how many GitHub-bound operations run at once
+and spaces their starts with a token bucket so concurrent ingestion steps do
+not burst. A token is charged per operation, and one operation (e.g. a
+paginated PyGithub call) may issue several requests, so the bucket paces work
+rather than counting requests. The hourly quota itself is protected by the
+remaining-quota check: when the quota reported by GitHub drops below a
+threshold, new operations are held until it resets instead of tripping 403s.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults can be tuned through the environment
+GITHUB_MAX_CONCURRENCY = int(os.getenv("GITHUB_MAX_CONCURRENCY", "8"))
+GITHUB_MIN_REMAINING = int(os.getenv("GITHUB_MIN_REMAINING", "50"))
+# Sustained rate of GitHub operations (not requests: a paginated call counts once);
+# the request quota itself is enforced through GITHUB_MIN_REMAINING
+GITHUB_OPERATIONS_PER_HOUR = int(os.getenv("GITHUB_OPERATIONS_PER_HOUR", "4500"))
+GITHUB_BURST = int(os.getenv("GITHUB_BURST", "100"))
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self):
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class GitHubRateLimiter:
+    """Async context manager gating GitHub operations on quota and concurrency."""
+
+    def __init__(self, max_concurrent: int = GITHUB_MAX_CONCURRENCY, min_remaining: int = GITHUB_MIN_REMAINING,
+                 operations_per_hour: int = GITHUB_OPERATIONS_PER_HOUR, burst: int = GITHUB_BURST):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._bucket = TokenBucket(operations_per_hour / 3600.0, burst)
+        self._min_remaining = min_remaining
+        # Wall-clock time (epoch seconds) before which no new operation starts
+        self._pause_until = 0.0
+
+    async def acquire(self):
+        """
+        Wait for any active pause to expire, then take a rate token and a concurrency slot.
+
+        One token is taken per operation, however many requests it makes.
+        """
+        delay = self._pause_until - time.time()
+        while delay > 0:
+            logger.warning("⏳ GitHub rate limit nearly exhausted, pausing %.0fs until reset", delay)
+            await asyncio.sleep(delay)
+            delay = self._pause_until - time.time()
+        await self._bucket.take()
+        await self._semaphore.acquire()
+
+    def release(self):
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def pause_for(self, seconds: float):
+        """Hold new operations for the given number of seconds (e.g. Retry-After)."""
+        self._pause_until = max(self._pause_until, time.time() + seconds)
+
+    def _record(self, remaining: Optional[int], reset_at: Optional[float]):
+        if remaining is not None and reset_at and remaining < self._min_remaining:
+            self._pause_until = max(self._pause_until, float(reset_at))
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Update state from X-RateLimit-* / Retry-After response headers."""
+        try:
+            retry_after = headers.get("Retry-After")
+            if retry_after:
+                self.pause_for(int(retry_after))
+            remaining = headers.get("X-RateLimit-Remaining")
+            reset_at = headers.get("X-RateLimit-Reset")
+            self._record(int(remaining) if remaining is not None else None,
+                         float(reset_at) if reset_at is not None else None)
+        except (TypeError, ValueError) as e:
+            logger.debug("Ignoring malformed rate limit headers: %s", e)
+
+    def update_from_client(self, github_client):
+        """
+        Update state from a PyGithub client.
+
+        PyGithub keeps the rate limit headers of its last response, so reading
+        them here does not cost an extra request once the client has been used.
+        """
+        try:
+            remaining, _ = github_client.rate_limiting
+            self._record(remaining, github_client.rate_limiting_resettime)
+        except Exception as e:
+            logger.debug("Could not read GitHub rate limit state: %s", e)
+
+
+# Limiter shared by every GitHub caller in the process
+_shared_limiter: Optional[GitHubRateLimiter] = None
+
+
+def get_github_rate_limiter() -> GitHubRateLimiter:
+    """Return the process-wide GitHubRateLimiter, creating it on first use."""
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = GitHubRateLimiter()
+    return _shared_limiter
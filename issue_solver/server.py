@@ -13,11 +13,11 @@ Usage:
 
 import os
 import sys
-import json
 import asyncio
 import logging
 from datetime import datetime
 from typing import Any, Dict
+import orjson
 from dotenv import load_dotenv
 
 # MCP imports
@@ -219,11 +219,12 @@ async def analyze_github_issue_tool(issue_url: str) -> str:
         logger.info("Analysis parsed successfully")
         
         # Create the detailed report text (same format as original analyze_issue.py)
+        timestamp = datetime.now().strftime('%d %B, %Y at %H:%M')
         detailed_report = f"""---
 ### Issue #{issue.number}: {issue.title}
-- Repository: {issue.repository.full_name}
+- Repository: {owner}/{repo}
 - Link: {issue.html_url}
-- Analyzed On: {datetime.now().strftime('%d %B, %Y at %H:%M')}
+- Analyzed On: {timestamp}
 - Status: {issue.state}
 
 | Category            | AI Analysis                                                  |
@@ -255,14 +256,14 @@ Proposed Solution:
             "issue_info": {
                 "number": issue.number,
                 "title": issue.title,
-                "repository": issue.repository.full_name,
+                "repository": f"{owner}/{repo}",
                 "url": issue.html_url,
                 "status": issue.state,
-                "analyzed_on": datetime.now().strftime('%d %B, %Y at %H:%M')
+                "analyzed_on": timestamp
             }
         }
         
-        return json.dumps(response_data, indent=2)
+        return orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode()
         
     except Exception as e:
         logger.error(f"Error analyzing GitHub issue: {e}")
@@ -289,7 +290,7 @@ async def generate_code_patch_tool(issue_body: str, repo_full_name: str) -> str:
         patch_data = generate_patch_for_issue(issue_body=issue_body, repo_full_name=repo_full_name)
         logger.info("Patch generation completed")
         
-        return json.dumps(patch_data, indent=2)
+        return orjson.dumps(patch_data, option=orjson.OPT_INDENT_2).decode()
         
     except Exception as e:
         logger.error(f"Error generating code patch: {e}")
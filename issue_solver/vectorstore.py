@@ -0,0 +1,30 @@
+"""
+Shared ChromaDB client and collection naming.
+
+Chroma allows a single client configuration per persist directory within a
+process, so ingestion, analysis, patch generation and the server all open
+collections through get_chroma_client() instead of building their own.
+"""
+
+import functools
+
+import chromadb
+from chromadb.config import Settings
+
+
+@functools.lru_cache(maxsize=None)
+def get_chroma_client(persist_dir: str) -> chromadb.ClientAPI:
+    """Return the process-wide persistent client for a Chroma directory."""
+    return chromadb.PersistentClient(
+        path=persist_dir,
+        settings=Settings(anonymized_telemetry=False, is_persistent=True)
+    )
+
+
+_COLLECTION_NAME_TABLE = str.maketrans("/-", "__")
+
+
+@functools.lru_cache(maxsize=2048)
+def collection_prefix(repo_name: str) -> str:
+    """Prefix of a repository's collection names, e.g. 'owner/my-repo' -> 'owner_my_repo'."""
+    return repo_name.translate(_COLLECTION_NAME_TABLE).lower()
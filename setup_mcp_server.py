@@ -12,8 +12,10 @@ This script:
 
 import os
 import sys
+import stat
 import subprocess
 import importlib
+import tempfile
 from pathlib import Path
 # add dotenv loader
 from dotenv import load_dotenv
@@ -48,7 +50,8 @@ def check_pip_packages():
         "mcp",
         "httpx",
         "aiofiles",
-        "tqdm"
+        "tqdm",
+        "orjson"
     ]
     
     missing_packages = []
@@ -258,6 +261,27 @@ def setup_official_github_mcp():
     print("  🎉 Official GitHub MCP Server (Docker) is set up!")
     return True
 
+def write_file_atomic(path: Path, text: str):
+    """Write text to path via a uniquely named temp file in the same directory, then rename it into place."""
+    # mkstemp creates the file as 0600; keep the existing file's mode, or the
+    # umask default a plain open() would give a new file
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
 def create_claude_config():
     """Create Claude Desktop configuration file."""
     print("\n🔧 Creating Claude Desktop configuration...")
@@ -347,9 +371,11 @@ def create_claude_config():
         # Create directory if it doesn't exist
         config_dir.mkdir(parents=True, exist_ok=True)
         
+        # Serialize once; the same text goes to both locations
+        config_text = json.dumps(config_content, indent=2)
+        
         # Write local config file for user to copy
-        with open(local_config_file, 'w') as f:
-            json.dump(config_content, f, indent=2)
+        write_file_atomic(local_config_file, config_text)
         
         print(f"  ✅ Configuration created at: {local_config_file}")
         print(f"  📋 To activate, copy to Claude Desktop:")
@@ -366,9 +392,7 @@ def create_claude_config():
         
         # Also try to write to system location if accessible
         try:
-            config_dir.mkdir(parents=True, exist_ok=True)
-            with open(config_file, 'w') as f:
-                json.dump(config_content, f, indent=2)
+            write_file_atomic(config_file, config_text)
             print(f"  ✅ Also installed to system location: {config_file}")
         except PermissionError:
             print(f"  ⚠️  Could not write to system location (use copy command above)")
@@ -11,6 +11,7 @@ import sys
 import json
 import asyncio
 import subprocess
+import orjson
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -174,8 +175,7 @@ def test_claude_desktop_config():
         return False
     
     try:
-        with open(config_file, 'r') as f:
-            config = json.load(f)
+        config = orjson.loads(config_file.read_bytes())
         
         if "mcpServers" in config and "github-issue-resolver" in config["mcpServers"]:
             server_config = config["mcpServers"]["github-issue-resolver"]
@@ -241,15 +241,16 @@ async def main():
         "Repository Status": test_repository_status,
     }
     
-    results = {}
-    
-    # Run async tests
-    for test_name, test_func in tests.items():
+    async def run_test(test_name, test_func):
         try:
-            results[test_name] = await test_func()
+            return await test_func()
         except Exception as e:
             print(f"❌ {test_name} crashed: {e}")
-            results[test_name] = False
+            return False
+    
+    # Run async tests concurrently; they are independent and mostly wait on the network
+    outcomes = await asyncio.gather(*(run_test(name, func) for name, func in tests.items()))
+    results = dict(zip(tests, outcomes))
     
     # Run sync tests
     results["Claude Desktop Config"] = test_claude_desktop_config()
@@ -0,0 +1,14 @@
+"""
+Shared pytest configuration.
+
+Puts the project root on sys.path once per session so test modules can
+import issue_solver and the server scripts without adjusting the path themselves.
+"""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for chunk storage in issue_solver.ingest.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from issue_solver import ingest
+
+
+class FakeCollection:
+    """In-memory stand-in for the chromadb collection used by chunk_and_embed_and_store."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, ids=None, where=None, include=None):
+        sources = set(where["source"]["$in"]) if where else None
+        return {"ids": [
+            row_id for row_id, metadata in self.rows.items()
+            if (ids is None or row_id in ids) and (sources is None or metadata["source"] in sources)
+        ]}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for row_id, metadata in zip(ids, metadatas):
+            self.rows[row_id] = metadata
+
+    def delete(self, ids):
+        for row_id in ids:
+            self.rows.pop(row_id, None)
+
+
+class FakeEmbeddings:
+    batch_size = 64
+
+    def embed_documents(self, texts):
+        return [[0.0] for _ in texts]
+
+
+def fake_chunk_documents(batch_docs, collection_name):
+    """One chunk per document, as the real chunker does for small files."""
+    return ([doc["content"] for doc in batch_docs],
+            [{"source": doc["source"], "type": "code"} for doc in batch_docs])
+
+
+class TestChunkAndEmbedAndStore(unittest.TestCase):
+    """Stale-chunk cleanup must only remove chunks of a source's previous versions."""
+
+    def setUp(self):
+        self.collection = FakeCollection()
+        patches = [
+            patch.object(ingest, "create_chroma_collection"),
+            patch.object(ingest, "get_chroma_client"),
+            patch.object(ingest, "_chunk_documents", fake_chunk_documents),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        ingest.get_chroma_client.return_value.get_collection.return_value = self.collection
+
+    def _store(self, documents):
+        return asyncio.run(ingest.chunk_and_embed_and_store(
+            documents, FakeEmbeddings(), "repo_code", "owner/repo"
+        ))
+
+    def test_source_spanning_batch_boundary_is_kept(self):
+        # 150 chunks of one file followed by other files: more than one 100-document batch
+        documents = [{"source": "big.py", "content": f"def f{i}(): pass"} for i in range(150)]
+        documents += [{"source": f"small_{i}.py", "content": f"x = {i}"} for i in range(10)]
+
+        stored = self._store(documents)
+
+        self.assertEqual(stored, 160)
+        self.assertEqual(len(self.collection.rows), 160)
+        self.assertEqual(
+            sum(1 for metadata in self.collection.rows.values() if metadata["source"] == "big.py"), 150
+        )
+
+    def test_reingest_removes_chunks_of_changed_source_only(self):
+        self._store([
+            {"source": "a.py", "content": "old a"},
+            {"source": "b.py", "content": "b"},
+        ])
+
+        stored = self._store([{"source": "a.py", "content": "new a"}])
+
+        self.assertEqual(stored, 1)
+        sources = sorted(metadata["source"] for metadata in self.collection.rows.values())
+        self.assertEqual(sources, ["a.py", "b.py"])
+
+    def test_failed_sub_batch_is_reported_when_requested(self):
+        class FlakyEmbeddings(FakeEmbeddings):
+            batch_size = 2
+
+            def embed_documents(self, texts):
+                if any("fail" in text for text in texts):
+                    raise RuntimeError("embedding service unavailable")
+                return super().embed_documents(texts)
+
+        documents = [{"source": f"{name}.py", "content": name} for name in ("a", "b", "fail", "c")]
+        with self.assertRaises(ingest.IncompleteIngestionError) as raised:
+            asyncio.run(ingest.chunk_and_embed_and_store(
+                documents, FlakyEmbeddings(), "repo_code", "owner/repo", raise_on_failure=True
+            ))
+
+        self.assertEqual((raised.exception.stored, raised.exception.failed), (2, 2))
+        self.assertEqual(len(self.collection.rows), 2)
+
+    def test_source_batches_never_split_a_source(self):
+        documents = [{"source": "a"}] * 60 + [{"source": "b"}] * 60 + [{"source": "c"}] * 150
+        batches = ingest._source_batches(documents, 100)
+
+        self.assertEqual([len(batch) for batch in batches], [60, 60, 150])
+        for batch in batches:
+            self.assertEqual(len({doc["source"] for doc in batch}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
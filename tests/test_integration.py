@@ -5,99 +5,115 @@ This demonstrates the complete workflow using the MCP client and server.
 """
 
 import os
-import sys
-import asyncio
+import importlib.util
 import unittest
 from unittest.mock import patch, MagicMock
-import json
-
-# Add project root to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from issue_solver.server import mcp as server_mcp
-from scripts.client import MCPClient
 
 class TestMCPServer(unittest.TestCase):
     """Test the MCP integration end-to-end."""
     
-    def setUp(self):
-        """Set up the test environment."""
-        self.server_process = None
-        self.client = None
-        # Use the new server path
-        self.server_script = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            "issue_solver",
-            "server.py"
-        )
-        self.test_repo = "test/repo"
-        self.test_issue_url = "https://github.com/test/repo/issues/1"
-    
-    def test_mcp_integration(self):
-        """Test the MCP integration end-to-end."""
+    # Canned responses used in place of GitHub and the LLM
+    MOCK_ANALYSIS_OUTPUT = """```json
+{
+    "summary": "Redis storage fails to deserialize datetime fields.",
+    "proposed_solution": "Serialize datetimes as ISO strings in the Redis storage backend.",
+    "complexity": 2,
+    "similar_issues": ["issue #3950"]
+}
+```"""
+    MOCK_PATCH_DATA = {
+        "filesToUpdate": [{"filePath": "agno/storage/redis.py", "functionName": "upsert", "patch": "..."}],
+        "summaryOfChanges": "Serialize datetime fields before writing sessions to Redis."
+    }
+
+    def _mock_issue(self):
+        issue = MagicMock()
+        issue.title = "Redis storage breaks on datetime fields"
+        issue.body = "Saving a session with RedisStorage raises TypeError: Object of type datetime is not JSON serializable"
+        issue.html_url = "https://github.com/agno-agi/agno/issues/4034"
+        issue.raw_data = {"repository_url": "https://api.github.com/repos/agno-agi/agno"}
+        return issue
+
+    @patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key", "GITHUB_TOKEN": "test-token"})
+    @patch("issue_solver.patch.generate_patch_for_issue")
+    @patch("issue_solver.analyze.create_langchain_agent")
+    @patch("issue_solver.analyze.get_github_issue")
+    def test_mcp_integration(self, mock_get_issue, mock_create_agent, mock_generate_patch):
+        """Test the MCP integration end-to-end against mocked GitHub and LLM calls."""
+        mock_get_issue.return_value = self._mock_issue()
+        mock_create_agent.return_value = self.MOCK_ANALYSIS_OUTPUT
+        mock_generate_patch.return_value = self.MOCK_PATCH_DATA
+
+        analysis, patch_data = self._run_workflow()
+
+        mock_get_issue.assert_called_once_with("agno-agi", "agno", 4034)
+        mock_generate_patch.assert_called_once()
+        self.assertEqual(mock_generate_patch.call_args[0][1], "agno-agi/agno")
+        self.assertEqual(analysis["complexity"], 2)
+        self.assertEqual(analysis["similar_issues"], ["issue #3950"])
+        self.assertEqual(len(patch_data["filesToUpdate"]), 1)
+
+    @unittest.skipUnless(os.getenv("RUN_LIVE_TESTS"), "set RUN_LIVE_TESTS=1 to call GitHub and Gemini")
+    def test_mcp_integration_live(self):
+        """Test the MCP integration end-to-end against the live GitHub and Gemini APIs."""
+        analysis, patch_data = self._run_workflow()
+        self.assertIn("summary", analysis)
+        self.assertIn("filesToUpdate", patch_data)
+
+    def _run_workflow(self):
+        """Fetch, analyze and patch the sample issue, returning (analysis, patch_data)."""
         
         print("🚀 Testing GitHub MCP Integration")
         print("=" * 50)
         
         # Test the direct analysis first (bypassing MCP)
         print("\n1. Testing direct analysis (non-MCP)...")
-        try:
-            from github_analyzer.analyze_issue import parse_github_url, get_github_issue, create_langchain_agent, parse_agent_output
-            
-            issue_url = "https://github.com/agno-agi/agno/issues/4034"
-            owner, repo, issue_num = parse_github_url(issue_url)
-            issue = get_github_issue(owner, repo, issue_num)
-            
-            print(f"✅ Successfully fetched issue: {issue.title}")
-            print(f"   Repository: {issue.repository.full_name}")
-            
-            # Test the analysis
-            print("   Running LangChain agent analysis...")
-            output = create_langchain_agent(issue)
-            analysis = parse_agent_output(output)
-            
-            print(f"✅ Analysis completed:")
-            print(f"   Summary: {analysis.get('summary', 'N/A')[:100]}...")
-            print(f"   Complexity: {analysis.get('complexity', 'N/A')}/5")
-            print(f"   Similar issues found: {len(analysis.get('similar_issues', []))}")
-            
-        except Exception as e:
-            print(f"❌ Direct analysis failed: {e}")
-            return False
+        from issue_solver.analyze import (
+            parse_github_url, get_github_issue, get_issue_repo_name,
+            create_langchain_agent, parse_agent_output
+        )
+        
+        issue_url = "https://github.com/agno-agi/agno/issues/4034"
+        owner, repo, issue_num = parse_github_url(issue_url)
+        issue = get_github_issue(owner, repo, issue_num)
+        # Read from the issue payload; issue.repository.full_name costs another request
+        repo_full_name = get_issue_repo_name(issue)
+        
+        print(f"✅ Successfully fetched issue: {issue.title}")
+        print(f"   Repository: {repo_full_name}")
+        
+        # Test the analysis
+        print("   Running LangChain agent analysis...")
+        output = create_langchain_agent(issue)
+        analysis = parse_agent_output(output)
+        
+        print(f"✅ Analysis completed:")
+        print(f"   Summary: {analysis.get('summary', 'N/A')[:100]}...")
+        print(f"   Complexity: {analysis.get('complexity', 'N/A')}/5")
+        print(f"   Similar issues found: {len(analysis.get('similar_issues', []))}")
         
         # Test patch generation
         print("\n2. Testing patch generation...")
-        try:
-            from patch_generator import generate_patch_for_issue
-            
-            issue_body = f"Title: {issue.title}\n\nBody: {issue.body or 'No description provided.'}"
-            patch_data = generate_patch_for_issue(issue_body, issue.repository.full_name)
-            
-            print(f"✅ Patch generation completed:")
-            print(f"   Files to update: {len(patch_data.get('filesToUpdate', []))}")
-            print(f"   Summary: {patch_data.get('summaryOfChanges', 'N/A')[:100]}...")
-            
-        except Exception as e:
-            print(f"❌ Patch generation failed: {e}")
-            return False
+        from issue_solver.patch import generate_patch_for_issue
+        
+        issue_body = f"Title: {issue.title}\n\nBody: {issue.body or 'No description provided.'}"
+        patch_data = generate_patch_for_issue(issue_body, repo_full_name)
+        
+        print(f"✅ Patch generation completed:")
+        print(f"   Files to update: {len(patch_data.get('filesToUpdate', []))}")
+        print(f"   Summary: {patch_data.get('summaryOfChanges', 'N/A')[:100]}...")
         
         print("\n3. MCP Server availability check...")
-        try:
-            # Check if we can import the MCP server
-            import github_mcp_server
-            print("✅ MCP Server module imported successfully")
-            
-            # Check if FastMCP is working
-            print("✅ FastMCP integration ready")
-            
-        except Exception as e:
-            print(f"❌ MCP Server check failed: {e}")
-            return False
+        # Locate the server module without executing it (importing it builds the
+        # FastMCP app and pulls in LangChain and Chroma)
+        spec = importlib.util.find_spec("github_issue_mcp_server")
+        self.assertIsNotNone(spec, "github_issue_mcp_server module not found")
+        print("✅ MCP Server module found")
         
         print("\n🎉 All tests completed successfully!")
         print("\nTo use the MCP integration:")
-        print("1. Start the MCP server: python github_mcp_server.py")
-        print("2. Use the MCP client: python github_mcp_client.py github_mcp_server.py")
+        print("1. Start the MCP server: python github_issue_mcp_server.py")
+        print("2. Use the MCP client: python examples/client.py github_issue_mcp_server.py")
         print("3. Or integrate with Claude Desktop or other MCP clients")
         
         print("\nExample MCP client commands:")
@@ -105,7 +121,7 @@ class TestMCPServer(unittest.TestCase):
         print("- generate patch for agno-agi/agno about Redis storage datetime issue")
         print("- check status of agno-agi/agno")
         
-        return True
+        return analysis, patch_data
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
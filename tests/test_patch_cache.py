@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the patch cache in issue_solver.patch.
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+# issue_solver.patch validates its API keys at import time
+with patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key", "GITHUB_TOKEN": "test-token"}):
+    from issue_solver.patch import PatchCache
+
+REPO = "owner/repo"
+PATCH_A = {"filesToUpdate": [{"filePath": "a.py", "patch": "..."}], "summaryOfChanges": "Fix A"}
+PATCH_B = {"filesToUpdate": [{"filePath": "b.py", "patch": "..."}], "summaryOfChanges": "Fix B"}
+
+
+class TestPatchCache(unittest.TestCase):
+    """Exact and near-duplicate tiers, TTL expiry and LRU eviction."""
+
+    def test_exact_hit_returns_copy(self):
+        cache = PatchCache(ttl=60, similarity=0)
+        cache.put(REPO, "issue body", [1.0, 0.0], PATCH_A)
+
+        cached = cache.get_exact(REPO, "issue body")
+        self.assertEqual(cached, PATCH_A)
+        cached["summaryOfChanges"] = "changed by caller"
+        self.assertEqual(cache.get_exact(REPO, "issue body"), PATCH_A)
+
+    def test_exact_miss_for_other_body_or_repo(self):
+        cache = PatchCache(ttl=60, similarity=0)
+        cache.put(REPO, "issue body", [1.0, 0.0], PATCH_A)
+
+        self.assertIsNone(cache.get_exact(REPO, "another issue body"))
+        self.assertIsNone(cache.get_exact("owner/other", "issue body"))
+
+    def test_similar_tier_disabled_by_zero_similarity(self):
+        cache = PatchCache(ttl=60, similarity=0)
+        cache.put(REPO, "issue body", [1.0, 0.0], PATCH_A)
+
+        self.assertIsNone(cache.get_similar(REPO, [1.0, 0.0]))
+
+    def test_similar_tier_matches_above_threshold_only(self):
+        cache = PatchCache(ttl=60, similarity=0.95)
+        cache.put(REPO, "issue a", [1.0, 0.0], PATCH_A)
+        cache.put(REPO, "issue b", [0.0, 1.0], PATCH_B)
+
+        self.assertEqual(cache.get_similar(REPO, [0.99, 0.05]), PATCH_A)
+        self.assertEqual(cache.get_similar(REPO, [0.05, 2.0]), PATCH_B)
+        self.assertIsNone(cache.get_similar(REPO, [1.0, 1.0]))
+        self.assertIsNone(cache.get_similar("owner/other", [1.0, 0.0]))
+
+    @patch("issue_solver.patch.time")
+    def test_entries_expire_after_ttl(self, mock_time):
+        cache = PatchCache(ttl=60, similarity=0.95)
+        mock_time.monotonic.return_value = 1000.0
+        cache.put(REPO, "issue body", [1.0, 0.0], PATCH_A)
+
+        mock_time.monotonic.return_value = 1059.0
+        self.assertEqual(cache.get_exact(REPO, "issue body"), PATCH_A)
+
+        mock_time.monotonic.return_value = 1061.0
+        self.assertIsNone(cache.get_exact(REPO, "issue body"))
+        self.assertIsNone(cache.get_similar(REPO, [1.0, 0.0]))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = PatchCache(ttl=60, similarity=0, max_entries=2)
+        cache.put(REPO, "first", [1.0, 0.0], PATCH_A)
+        cache.put(REPO, "second", [0.0, 1.0], PATCH_B)
+        # Reading "first" makes "second" the least recently used
+        cache.get_exact(REPO, "first")
+        cache.put(REPO, "third", [1.0, 1.0], PATCH_B)
+
+        self.assertIsNotNone(cache.get_exact(REPO, "first"))
+        self.assertIsNone(cache.get_exact(REPO, "second"))
+        self.assertIsNotNone(cache.get_exact(REPO, "third"))
+
+    def test_invalidate_drops_repository(self):
+        cache = PatchCache(ttl=60, similarity=0)
+        cache.put(REPO, "issue body", [1.0, 0.0], PATCH_A)
+        cache.invalidate(REPO)
+
+        self.assertIsNone(cache.get_exact(REPO, "issue body"))
+
+
+if __name__ == "__main__":
+    unittest.main()